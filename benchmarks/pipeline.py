@@ -0,0 +1,469 @@
+"""End-to-end benchmark of the bet pipeline.
+
+Runs line-provider and bet-maker in one process, connected by an in-process
+stand-in for the RabbitMQ exchange, against a throwaway Postgres database
+that is created, migrated and dropped by the run. Both apps are driven
+through their HTTP routes at fixed rates (open loop, so a slow response does
+not slow the load down):
+
+- ``POST /event`` on line-provider to set up the events,
+- ``PUT /update_coefficient`` on line-provider,
+- ``POST /create_bet`` on bet-maker.
+
+The report has p50/p99 latency and throughput per route, and the delay from
+sending ``/update_coefficient`` until bet-maker has committed that version
+(or a later one) to its database. It is written as JSON; ``--baseline``
+compares it with an earlier report and exits with 1 on a regression.
+
+    python benchmarks/pipeline.py --duration 10 --update-rate 500 --bet-rate 200
+"""
+
+import argparse
+import asyncio
+import bisect
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import ModuleType
+from typing import Awaitable, Callable
+
+import asyncpg
+import httpx
+from loguru import logger
+
+ROOT = Path(__file__).resolve().parent.parent
+LINE_PROVIDER = ROOT / "line-provider"
+BET_MAKER = ROOT / "bet-maker"
+
+
+def load_service(directory: Path) -> dict[str, ModuleType]:
+    """Import a service's ``main`` and take its modules out of ``sys.modules``.
+
+    Both services use the same flat module names (``config``, ``services``,
+    ``codec``...), so each one is imported on its own and kept in the
+    returned dict; the loaded code keeps working through its own globals.
+    """
+    sys.path.insert(0, str(directory))
+    try:
+        importlib.import_module("main")
+    finally:
+        sys.path.remove(str(directory))
+    modules = {}
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if path and Path(path).resolve().is_relative_to(directory):
+            modules[name] = sys.modules.pop(name)
+    return modules
+
+
+class LocalMessage:
+    """What the consumers need of an ``aio_pika.IncomingMessage``."""
+
+    def __init__(self, broker: "LocalBroker", body: bytes, content_type: str, message_id: str):
+        self.broker = broker
+        self.body = body
+        self.content_type = content_type
+        self.message_id = message_id
+        self.redelivered = False
+
+    async def ack(self) -> None:
+        self.broker.acked += 1
+
+    async def nack(self, requeue: bool = True) -> None:
+        if requeue:
+            self.redelivered = True
+            self.broker.redelivered += 1
+            self.broker.deliver(self)
+
+    async def reject(self, requeue: bool = False) -> None:
+        self.broker.rejected += 1
+
+
+class LocalBroker:
+    """In-process stand-in for the events fanout exchange.
+
+    Takes the place of line-provider's ``RabbitMQ`` publisher and delivers
+    every published message to each subscriber on its own task, as a broker
+    would, so publishing never waits for the consumer.
+    """
+
+    is_connected = True
+
+    def __init__(self):
+        self.subscribers: list[Callable[[LocalMessage], Awaitable[None]]] = []
+        self.published = 0
+        self.acked = 0
+        self.redelivered = 0
+        self.rejected = 0
+        self._deliveries: set[asyncio.Task] = set()
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def subscribe(self, on_message: Callable[[LocalMessage], Awaitable[None]]) -> None:
+        self.subscribers.append(on_message)
+
+    async def send_message(self, body: bytes, content_type: str, message_id: str) -> None:
+        self.published += 1
+        self.deliver(LocalMessage(self, body, content_type, message_id))
+
+    def deliver(self, message: LocalMessage) -> None:
+        for on_message in self.subscribers:
+            task = asyncio.get_running_loop().create_task(on_message(message))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "acked": self.acked,
+            "redelivered": self.redelivered,
+            "rejected": self.rejected,
+        }
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(q * len(values)) - 1))]
+
+
+def summarize(latencies: list[float]) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+class Operation:
+    """Latencies and failures of one kind of request."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.duration = 0.0
+
+    async def drive(
+        self, rate: float, duration: float, request: Callable[[], Awaitable[bool]]
+    ) -> None:
+        """Start ``request`` ``rate`` times a second for ``duration`` seconds.
+
+        Latency is measured from the scheduled start, so time spent queued
+        behind a stalled event loop is counted too.
+        """
+        interval, tasks = 1 / rate, []
+        started = time.perf_counter()
+        for i in range(int(rate * duration)):
+            scheduled = started + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self._timed(request, scheduled)))
+        await asyncio.gather(*tasks)
+        self.duration = time.perf_counter() - started
+
+    async def _timed(self, request: Callable[[], Awaitable[bool]], scheduled: float) -> None:
+        try:
+            ok = await request()
+        except Exception as e:
+            logger.warning(f"{self.name} failed: {e!r}")
+            ok = False
+        if ok:
+            self.latencies.append(time.perf_counter() - scheduled)
+        else:
+            self.errors += 1
+
+    def report(self) -> dict:
+        return {
+            **summarize(self.latencies),
+            "errors": self.errors,
+            "throughput_rps": round(len(self.latencies) / self.duration, 1)
+            if self.duration
+            else 0.0,
+        }
+
+
+class Propagation:
+    """Delay from sending an event version until bet-maker committed it.
+
+    Intermediate versions may be coalesced away on the way, so a version
+    counts as propagated once it or any later version is committed.
+    """
+
+    def __init__(self):
+        self.sent: dict[tuple[str, int], float] = {}
+        self.applied: dict[str, list[tuple[int, float]]] = {}
+
+    def on_sent(self, event_id: str, version: int, at: float) -> None:
+        self.sent[(event_id, version)] = at
+
+    def on_applied(self, events, at: float) -> None:
+        for event in events:
+            bisect.insort(self.applied.setdefault(event.event_id, []), (event.version, at))
+
+    def pending(self) -> int:
+        return sum(1 for key in self.sent if self._applied_at(*key) is None)
+
+    def _applied_at(self, event_id: str, version: int) -> float | None:
+        applied = self.applied.get(event_id, [])
+        position = bisect.bisect_left(applied, (version, float("-inf")))
+        if position == len(applied):
+            return None
+        return min(at for _, at in applied[position:])
+
+    def report(self) -> dict:
+        delays = []
+        for (event_id, version), sent_at in self.sent.items():
+            applied_at = self._applied_at(event_id, version)
+            if applied_at is not None:
+                delays.append(max(applied_at - sent_at, 0.0))
+        return {**summarize(delays), "lost": len(self.sent) - len(delays)}
+
+
+async def create_database(dsn: str, name: str) -> None:
+    connection = await asyncpg.connect(dsn)
+    try:
+        await connection.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        await connection.close()
+
+
+async def drop_database(dsn: str, name: str) -> None:
+    connection = await asyncpg.connect(dsn)
+    try:
+        await connection.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+    finally:
+        await connection.close()
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+async def run(args: argparse.Namespace, line_provider: dict, bet_maker: dict) -> dict:
+    broker = LocalBroker()
+    lp_services, lp_main = line_provider["services"], line_provider["main"]
+    lp_services.publisher = lp_main.publisher = broker
+    lp_services.update_buffer.publisher = broker
+
+    propagation = Propagation()
+    apply_events = bet_maker["main"].apply_events
+
+    async def on_events(events) -> None:
+        await apply_events(events)
+        propagation.on_applied(events, time.perf_counter())
+
+    bm_settings = bet_maker["config"].settings
+    consumer = bet_maker["consumer"].EventConsumer(
+        on_events,
+        bm_settings.CONSUMER_LANES,
+        bm_settings.CONSUMER_BATCH_SIZE,
+        bm_settings.CONSUMER_BATCH_TIMEOUT_MS,
+        bm_settings.CONSUMER_LANE_CAPACITY,
+        bm_settings.CONSUMER_MAX_ATTEMPTS,
+        bm_settings.CONSUMER_RETRY_BACKOFF_MS,
+    )
+    await bet_maker["services"].load_event_cache()
+    await bet_maker["partitions"].partition_maintainer.create_partitions()
+    consumer.start()
+    await broker.subscribe(consumer.on_message)
+    event_cache = bet_maker["cache"].event_cache
+
+    line_provider_client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=lp_main.app), base_url="http://line-provider"
+    )
+    bet_maker_client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=bet_maker["main"].app), base_url="http://bet-maker"
+    )
+    random.seed(args.seed)
+    started_at = datetime.now(timezone.utc).isoformat()
+    deadline = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    event_ids = [f"bench-{uuid.uuid4().hex[:12]}" for _ in range(args.events)]
+    remaining = iter(event_ids)
+
+    async def create_event() -> bool:
+        response = await line_provider_client.post(
+            "/event",
+            json={
+                "event_id": next(remaining),
+                "coefficient": "1.50",
+                "deadline": deadline,
+                "state": "NEW",
+            },
+        )
+        return response.status_code == 200
+
+    async def update_coefficient() -> bool:
+        event_id = random.choice(event_ids)
+        coefficient = f"{random.uniform(1.01, 9.99):.2f}"
+        sent_at = time.perf_counter()
+        response = await line_provider_client.put(
+            "/update_coefficient",
+            params={"event_id": event_id, "new_coefficient": coefficient},
+        )
+        if response.status_code != 200:
+            return False
+        propagation.on_sent(event_id, response.json()["version"], sent_at)
+        return True
+
+    async def create_bet() -> bool:
+        response = await bet_maker_client.post(
+            "/create_bet",
+            json={
+                "event_id": random.choice(event_ids),
+                "status": "PENDING",
+                "amount": "10.00",
+            },
+        )
+        return response.status_code == 200
+
+    operations = {
+        name: Operation(name)
+        for name in ("create_event", "update_coefficient", "create_bet")
+    }
+    async with lp_main.app.router.lifespan_context(lp_main.app):
+        await operations["create_event"].drive(
+            args.event_rate, args.events / args.event_rate, create_event
+        )
+        await wait_for(lambda: all(event_cache.get(e) for e in event_ids), args.settle_timeout)
+        await asyncio.gather(
+            operations["update_coefficient"].drive(args.update_rate, args.duration, update_coefficient),
+            operations["create_bet"].drive(args.bet_rate, args.duration, create_bet),
+        )
+        await wait_for(lambda: propagation.pending() == 0, args.settle_timeout)
+    await consumer.stop()
+    await line_provider_client.aclose()
+    await bet_maker_client.aclose()
+    await bet_maker["db"].engine.dispose()
+
+    return {
+        "commit": git_commit(),
+        "started_at": started_at,
+        "python": platform.python_version(),
+        "config": {
+            key: getattr(args, key)
+            for key in ("events", "event_rate", "update_rate", "bet_rate", "duration", "seed")
+        },
+        "operations": {name: op.report() for name, op in operations.items()},
+        "propagation": propagation.report(),
+        "broker": broker.stats(),
+    }
+
+
+async def wait_for(condition: Callable[[], bool], timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of ``report`` against ``baseline`` beyond ``tolerance``."""
+    regressions = []
+    sections = {**report["operations"], "propagation": report["propagation"]}
+    base_sections = {**baseline["operations"], "propagation": baseline["propagation"]}
+    for name, current in sections.items():
+        base = base_sections.get(name)
+        if not base:
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            if base[key] and current[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name} {key}: {base[key]} -> {current[key]}")
+        if base.get("throughput_rps") and current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name} throughput_rps: {base['throughput_rps']} -> {current['throughput_rps']}"
+            )
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=200, help="events to create")
+    parser.add_argument("--event-rate", type=float, default=200, help="event creations per second")
+    parser.add_argument("--update-rate", type=float, default=200, help="coefficient updates per second")
+    parser.add_argument("--bet-rate", type=float, default=100, help="bets per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of updates and bets")
+    parser.add_argument("--settle-timeout", type=float, default=30, help="seconds to wait for propagation")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="report path, benchmarks/results/<commit>.json by default")
+    parser.add_argument("--baseline", type=Path, help="earlier report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--keep-db", action="store_true", help="do not drop the benchmark database")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    db_name = f"bsw_bench_{uuid.uuid4().hex[:8]}"
+    os.environ["DB_NAME"] = db_name
+    os.environ.setdefault("EVENT_BACKEND", "memory")
+    os.environ["EVENT_LOG_DIR"] = tempfile.mkdtemp(prefix="bsw-bench-")
+
+    line_provider = load_service(LINE_PROVIDER)
+    bet_maker = load_service(BET_MAKER)
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    settings = bet_maker["config"].settings
+    admin_dsn = (
+        f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}"
+        f"@{settings.DB_HOST}:{settings.DB_PORT}/postgres"
+    )
+    asyncio.run(create_database(admin_dsn, db_name))
+    try:
+        migration = subprocess.run(
+            [sys.executable, "-m", "alembic", "upgrade", "head"],
+            cwd=BET_MAKER, capture_output=True, text=True,
+        )
+        if migration.returncode:
+            sys.stderr.write(migration.stderr)
+            return migration.returncode
+        report = asyncio.run(run(args, line_provider, bet_maker))
+    finally:
+        if not args.keep_db:
+            asyncio.run(drop_database(admin_dsn, db_name))
+
+    output = args.output or ROOT / "benchmarks" / "results" / f"{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(json.dumps(report, indent=2))
+    print(f"Report written to {output}")
+
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Startup replay benchmark of the line-provider event store.
+
+Writes a snapshot of ``--events`` events in deadline order, as compaction
+does, plus ``--log-records`` changes to random events in the log, to a
+temporary directory. Then it times what ``MemoryBackend.start`` does before
+the service can serve: ``EventLog.replay`` reading both files through mmap
+and ``EventStore.load`` building the events and the deadline index. Exits
+with 1 when the total is over ``--target`` seconds.
+
+    python benchmarks/replay.py --events 1000000 --log-records 100000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "line-provider"))
+
+import msgspec  # noqa: E402
+from eventlog import SNAPSHOT_FRAME_SIZE, EventLog, frame  # noqa: E402
+from store import EventRecord, EventStore  # noqa: E402
+
+
+def make_record(index: int, deadline_ts: float, version: int) -> EventRecord:
+    return EventRecord(
+        event_id=f"event-{index}",
+        coefficient="1.50",
+        deadline=time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(deadline_ts)),
+        deadline_ts=deadline_ts,
+        state="NEW",
+        version=version,
+    )
+
+
+def write_files(log: EventLog, events: int, log_records: int, seed: int) -> None:
+    """Half the events are past their deadline, the rest spread over a week."""
+    rng = random.Random(seed)
+    now = time.time()
+    deadlines = sorted(now + rng.uniform(-7, 7) * 86400 for _ in range(events))
+    encoder = msgspec.msgpack.Encoder()
+    log.directory.mkdir(parents=True, exist_ok=True)
+    with open(log.snapshot_path, "wb") as file:
+        for start in range(0, events, SNAPSHOT_FRAME_SIZE):
+            file.write(
+                frame(
+                    [
+                        make_record(index, deadlines[index], 1)
+                        for index in range(start, min(start + SNAPSHOT_FRAME_SIZE, events))
+                    ],
+                    encoder,
+                )
+            )
+    with open(log.log_path, "wb") as file:
+        changes = [
+            make_record(rng.randrange(events), now + rng.uniform(-7, 7) * 86400, 2)
+            for _ in range(log_records)
+        ]
+        for start in range(0, log_records, SNAPSHOT_FRAME_SIZE):
+            file.write(frame(changes[start : start + SNAPSHOT_FRAME_SIZE], encoder))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=1_000_000, help="events in the snapshot")
+    parser.add_argument("--log-records", type=int, default=100_000, help="changes in the log")
+    parser.add_argument("--target", type=float, default=1.0, help="allowed seconds for replay and load")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        log = EventLog(directory, fsync_interval_ms=10, compact_bytes=1 << 30)
+        write_files(log, args.events, args.log_records, args.seed)
+
+        started = time.perf_counter()
+        snapshot, changes = log.replay()
+        replayed = time.perf_counter()
+        store = EventStore()
+        store.load(snapshot, changes)
+        loaded = time.perf_counter()
+        log._file.close()
+
+    total = loaded - started
+    print(
+        f"replay {replayed - started:.3f}s, load {loaded - replayed:.3f}s, "
+        f"total {total:.3f}s for {len(store)} events "
+        f"({len(store._deadlines)} active, {args.log_records} log records)"
+    )
+    return 0 if total <= args.target else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
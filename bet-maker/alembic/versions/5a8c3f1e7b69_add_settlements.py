@@ -0,0 +1,30 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '5a8c3f1e7b69'
+down_revision: Union[str, None] = 'e3f9a0c6d512'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('bets', sa.Column('payout', sa.Numeric(precision=12, scale=2), nullable=True))
+    op.create_table('settlements',
+    sa.Column('event_id', sa.String(), nullable=False),
+    sa.Column('status', postgresql.ENUM('PENDING', 'WON', 'LOSE', name='betstatus', create_type=False), nullable=False),
+    sa.Column('settled_count', sa.BigInteger(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['events.event_id'], ),
+    sa.PrimaryKeyConstraint('event_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('settlements')
+    op.drop_column('bets', 'payout')
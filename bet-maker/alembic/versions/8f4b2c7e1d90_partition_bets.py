@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '8f4b2c7e1d90'
+down_revision: Union[str, None] = 'c2a4d6e8f013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+COLUMNS = 'bet_id, event_id, amount, status, created_at, coefficient, payout'
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def create_bets_table(partitioned: bool) -> None:
+    op.create_table('bets',
+    sa.Column('bet_id', sa.Uuid(), nullable=False),
+    sa.Column('event_id', sa.String(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('status', sa.dialects.postgresql.ENUM('PENDING', 'WON', 'LOSE', name='betstatus', create_type=False), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('coefficient', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('payout', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['events.event_id'], name='bets_event_id_fkey'),
+    sa.PrimaryKeyConstraint(*(['bet_id', 'created_at'] if partitioned else ['bet_id']), name='bets_pkey'),
+    **({'postgresql_partition_by': 'RANGE (created_at)'} if partitioned else {})
+    )
+    op.create_index('ix_bets_event_id_status', 'bets', ['event_id', 'status'], unique=False)
+    op.create_index('ix_bets_created_at_bet_id', 'bets', ['created_at', 'bet_id'], unique=False)
+
+
+def rename_bets_table() -> None:
+    op.rename_table('bets', 'bets_old')
+    op.execute('ALTER TABLE bets_old RENAME CONSTRAINT bets_pkey TO bets_old_pkey')
+    op.execute('ALTER TABLE bets_old RENAME CONSTRAINT bets_event_id_fkey TO bets_old_event_id_fkey')
+    op.execute('ALTER INDEX ix_bets_event_id_status RENAME TO ix_bets_old_event_id_status')
+    op.execute('ALTER INDEX ix_bets_created_at_bet_id RENAME TO ix_bets_old_created_at_bet_id')
+
+
+def upgrade() -> None:
+    rename_bets_table()
+    create_bets_table(partitioned=True)
+
+    first = op.get_bind().execute(sa.text('SELECT min(created_at) FROM bets_old')).scalar()
+    month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    start = min(first or month, month).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = add_months(month, MONTHS_AHEAD + 1)
+    while start < end:
+        upper = add_months(start, 1)
+        op.execute(
+            f"CREATE TABLE bets_p{start:%Y_%m} PARTITION OF bets "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+        )
+        start = upper
+    op.execute('CREATE TABLE bets_default PARTITION OF bets DEFAULT')
+
+    op.execute(f'INSERT INTO bets ({COLUMNS}) SELECT {COLUMNS} FROM bets_old')
+    op.drop_table('bets_old')
+
+
+def downgrade() -> None:
+    rename_bets_table()
+    create_bets_table(partitioned=False)
+    op.execute(f'INSERT INTO bets ({COLUMNS}) SELECT {COLUMNS} FROM bets_old')
+    op.drop_table('bets_old')
@@ -0,0 +1,18 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b7d2e5a1c843'
+down_revision: Union[str, None] = '4c1e7b2d9f30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('bets', sa.Column('coefficient', sa.Numeric(precision=10, scale=2), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('bets', 'coefficient')
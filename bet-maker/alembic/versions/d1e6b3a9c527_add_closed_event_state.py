@@ -0,0 +1,27 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd1e6b3a9c527'
+down_revision: Union[str, None] = '8f4b2c7e1d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ALTER TYPE ... ADD VALUE can not run inside a transaction block on older Postgres.
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE eventstate ADD VALUE IF NOT EXISTS 'CLOSED'")
+
+
+def downgrade() -> None:
+    # Enum values can not be dropped, so the type is rebuilt without it.
+    op.execute("UPDATE events SET state = 'NEW' WHERE state = 'CLOSED'")
+    op.drop_index('ix_events_open_deadline', table_name='events', postgresql_where=sa.text("state = 'NEW'"))
+    op.execute("ALTER TYPE eventstate RENAME TO eventstate_old")
+    op.execute("CREATE TYPE eventstate AS ENUM ('NEW', 'FINISHED_WIN', 'FINISHED_LOSE')")
+    op.execute("ALTER TABLE events ALTER COLUMN state TYPE eventstate USING state::text::eventstate")
+    op.execute("DROP TYPE eventstate_old")
+    op.create_index('ix_events_open_deadline', 'events', ['deadline'], unique=False, postgresql_where=sa.text("state = 'NEW'"))
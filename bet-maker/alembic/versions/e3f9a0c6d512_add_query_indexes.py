@@ -0,0 +1,26 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e3f9a0c6d512'
+down_revision: Union[str, None] = 'b7d2e5a1c843'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_bets_bet_id', table_name='bets')
+    op.drop_index('ix_events_event_id', table_name='events')
+    op.create_index('ix_bets_event_id_status', 'bets', ['event_id', 'status'], unique=False)
+    op.create_index('ix_bets_created_at_bet_id', 'bets', ['created_at', 'bet_id'], unique=False)
+    op.create_index('ix_events_open_deadline', 'events', ['deadline'], unique=False, postgresql_where=sa.text("state = 'NEW'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_open_deadline', table_name='events', postgresql_where=sa.text("state = 'NEW'"))
+    op.drop_index('ix_bets_created_at_bet_id', table_name='bets')
+    op.drop_index('ix_bets_event_id_status', table_name='bets')
+    op.create_index('ix_events_event_id', 'events', ['event_id'], unique=False)
+    op.create_index('ix_bets_bet_id', 'bets', ['bet_id'], unique=False)
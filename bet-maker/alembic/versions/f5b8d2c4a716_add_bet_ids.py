@@ -0,0 +1,25 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'f5b8d2c4a716'
+down_revision: Union[str, None] = 'd1e6b3a9c527'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('bet_ids',
+    sa.Column('bet_id', sa.Uuid(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('bet_id')
+    )
+    op.execute('INSERT INTO bet_ids (bet_id, created_at) SELECT bet_id, min(created_at) FROM bets GROUP BY bet_id')
+    op.create_index('ix_bet_ids_created_at', 'bet_ids', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bet_ids_created_at', table_name='bet_ids')
+    op.drop_table('bet_ids')
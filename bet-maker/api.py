@@ -1,17 +1,40 @@
-from typing import List
+from datetime import datetime
+from typing import List, Literal
 
-from fastapi import APIRouter
-from schemas import Event, Bet, BetCreateMessage
-from services import processing_get_events, processing_get_bets, processing_create_bet
+from fastapi import APIRouter, Query, Response
+from fastapi.responses import StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from schemas import Event, Bet, BetBatchResult, BetCreateMessage, BetFilter, BetsPage
+from services import (
+    processing_get_events,
+    processing_stream_events,
+    processing_get_bets,
+    processing_create_bet,
+    processing_create_bets,
+    processing_stream_bets,
+    processing_get_db_pool_stats,
+    processing_get_metrics,
+)
 
 router = APIRouter()
 
 
-@router.get("/event")
-async def get_events() -> List[Event]:
+@router.get("/event", response_model=List[Event])
+async def get_events() -> Response:
     """Getting all events that are still active. (deadline has not passed)"""
     result = await processing_get_events()
-    return result
+    return Response(content=result, media_type="application/json")
+
+
+@router.get("/event/stream")
+async def stream_events() -> StreamingResponse:
+    """Streaming the events open for betting and then their changes as Server-Sent Events"""
+    result = await processing_stream_events()
+    return StreamingResponse(
+        result,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/create_bet")
@@ -21,8 +44,46 @@ async def create_bet(bet_data: Bet) -> BetCreateMessage:
     return result
 
 
-@router.get("/bets")
-async def get_bets() -> List[Bet]:
-    """Getting all bets"""
-    result = await processing_get_bets()
+@router.post("/bets/batch")
+async def create_bets(bets: List[Bet]) -> BetBatchResult:
+    """Bulk bet creating with a per-bet result."""
+    result = await processing_create_bets(bets)
+    return result
+
+
+@router.get("/bets", response_model=BetsPage)
+async def get_bets(
+    event_id: str | None = None,
+    status: Literal["PENDING", "WON", "LOSE"] | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(100, gt=0, le=1000),
+    format: Literal["json", "ndjson"] = "json",
+) -> BetsPage | StreamingResponse:
+    """Getting bets page by page, or all of them as an NDJSON stream"""
+    filters = BetFilter(
+        event_id=event_id,
+        status=status,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    if format == "ndjson":
+        result = await processing_stream_bets(filters, cursor)
+        return StreamingResponse(result, media_type="application/x-ndjson")
+    result = await processing_get_bets(filters, limit, cursor)
     return result
+
+
+@router.get("/db_pool")
+async def get_db_pool_stats() -> dict:
+    """Getting database connection pool statistics"""
+    result = await processing_get_db_pool_stats()
+    return result
+
+
+@router.get("/metrics")
+async def get_metrics() -> Response:
+    """Getting metrics in the Prometheus text format"""
+    result = await processing_get_metrics()
+    return Response(content=result, media_type=CONTENT_TYPE_LATEST)
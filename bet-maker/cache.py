@@ -0,0 +1,111 @@
+import asyncio
+import heapq
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Protocol
+
+import msgspec
+from logger import logger
+
+
+class EventLike(Protocol):
+    event_id: str
+    coefficient: Decimal
+    deadline: datetime
+    state: str
+
+
+class CachedEvent(msgspec.Struct):
+    event_id: str
+    coefficient: Decimal
+    deadline: datetime
+    state: str
+
+
+class EventCache:
+    """Process-local index of the events that are open for betting.
+
+    Entries are kept fresh by the AMQP consumer and expire at their deadline,
+    which is tracked by a heap of ``(deadline, event_id)`` with a timer armed
+    for the earliest one. The JSON body of ``GET /event`` is serialized once
+    and rebuilt only after the set of events changes.
+    """
+
+    def __init__(self):
+        self.events: dict[str, CachedEvent] = {}
+        self._deadlines: list[tuple[datetime, str]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._timer_at: datetime | None = None
+        self._body: bytes | None = None
+        self._encoder = msgspec.json.Encoder()
+
+    def update(self, events: Iterable[EventLike]) -> None:
+        """Apply committed event changes in version order."""
+        now = datetime.now()
+        for event in events:
+            deadline = event.deadline.replace(tzinfo=None)
+            if event.state != "NEW" or deadline <= now:
+                if self.events.pop(event.event_id, None) is not None:
+                    self._body = None
+                continue
+            previous = self.events.get(event.event_id)
+            self.events[event.event_id] = CachedEvent(
+                event_id=event.event_id,
+                coefficient=Decimal(event.coefficient).quantize(Decimal("0.01")),
+                deadline=deadline,
+                state=event.state,
+            )
+            if previous is None or previous.deadline != deadline:
+                heapq.heappush(self._deadlines, (deadline, event.event_id))
+            self._body = None
+        self._arm_timer()
+
+    def get(self, event_id: str) -> CachedEvent | None:
+        """Return the event if it is still open for betting."""
+        event = self.events.get(event_id)
+        if event is None or event.deadline <= datetime.now():
+            return None
+        return event
+
+    def body(self) -> bytes:
+        """JSON array of all events open for betting."""
+        self.expire()
+        if self._body is None:
+            self._body = self._encoder.encode(list(self.events.values()))
+        return self._body
+
+    def expire(self) -> None:
+        """Drop every event whose deadline has passed."""
+        now = datetime.now()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, event_id = heapq.heappop(self._deadlines)
+            event = self.events.get(event_id)
+            if event is not None and event.deadline == deadline:
+                del self.events[event_id]
+                self._body = None
+
+    def _arm_timer(self) -> None:
+        if not self._deadlines:
+            return
+        next_deadline = self._deadlines[0][0]
+        if self._timer_at is not None and self._timer_at <= next_deadline:
+            return
+        if self._timer:
+            self._timer.cancel()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        delay = max((next_deadline - datetime.now()).total_seconds(), 0)
+        self._timer = loop.call_later(delay, self._on_timer)
+        self._timer_at = next_deadline
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._timer_at = None
+        self.expire()
+        self._arm_timer()
+        logger.info(f"Event cache holds {len(self.events)} events open for betting.")
+
+
+event_cache = EventCache()
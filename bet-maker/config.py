@@ -5,17 +5,57 @@ class Settings(BaseSettings):
     APP_HOST: str = "0.0.0.0"
     APP_PORT: int = 8001
 
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_RATE_LIMIT_PER_S: float = 20.0
+    LOG_RATE_LIMIT_BURST: int = 100
+    LOG_SAMPLING: dict[str, float] = {}
+
     DB_NAME: str = "bsw-db"
     DB_USER: str = "postgres"
     DB_PASSWORD: str = "postgres"
     DB_HOST: str = "postgres"
     DB_PORT: str = "5432"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_S: float = 30.0
+    DB_POOL_RECYCLE_S: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_SLOW_ACQUIRE_MS: int = 100
+    DB_STATEMENT_CACHE_SIZE: int = 256
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    DB_REPLICA_HOST: str | None = None
+    DB_REPLICA_PORT: str = "5432"
+    DB_REPLICA_MAX_LAG_S: float = 5.0
+    DB_REPLICA_CHECK_INTERVAL_S: float = 1.0
+
+    BETS_BATCH_MAX_SIZE: int = 1000
+    SETTLEMENT_CHUNK_SIZE: int = 5000
+    SETTLEMENT_POLL_INTERVAL_S: float = 5.0
+    BETS_PARTITION_MONTHS_AHEAD: int = 3
+    BETS_PARTITION_RETENTION_MONTHS: int = 6
+    BETS_ARCHIVE_DIR: str = "archive"
+    PARTITION_MAINTENANCE_INTERVAL_S: float = 3600.0
+
+    STREAM_MAX_PENDING: int = 1000
+    STREAM_KEEPALIVE_S: float = 15.0
 
     RABBITMQ_HOST: str = "rabbitmq:5672"
     RABBITMQ_USER: str = "rabbitmq"
     RABBITMQ_PASSWORD: str = "rabbitmq"
     RABBITMQ_QUEUE_NAME: str = "events"
     RABBITMQ_EXCHANGE_NAME: str = "events"
+    RABBITMQ_PREFETCH_COUNT: int = 1000
+    RABBITMQ_OUTBOX_EXCHANGE_NAME: str = "bets"
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL_S: float = 1.0
+    CONSUMER_LANES: int = 8
+    CONSUMER_LANE_CAPACITY: int = 1000
+    CONSUMER_BATCH_SIZE: int = 200
+    CONSUMER_BATCH_TIMEOUT_MS: int = 50
+    CONSUMER_MAX_ATTEMPTS: int = 3
+    CONSUMER_RETRY_BACKOFF_MS: int = 100
+    HIGH_WATER_MARK_GRACE_S: float = 86400.0
 
     @property
     def database_settings(self) -> dict:
@@ -33,6 +73,18 @@ class Settings(BaseSettings):
             **self.database_settings,
         )
 
+    @property
+    def database_replica_uri_async(self) -> str | None:
+        if not self.DB_REPLICA_HOST:
+            return None
+        return "postgresql+asyncpg://{user}:{password}@{host}:{port}/{database}".format(
+            **{
+                **self.database_settings,
+                "host": self.DB_REPLICA_HOST,
+                "port": self.DB_REPLICA_PORT,
+            },
+        )
+
     @property
     def rabbitmq_url(self) -> str:
         return f"amqp://{self.RABBITMQ_USER}:{self.RABBITMQ_PASSWORD}@{self.RABBITMQ_HOST}/"
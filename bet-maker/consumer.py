@@ -0,0 +1,169 @@
+import asyncio
+import zlib
+from typing import Awaitable, Callable
+
+from aio_pika import IncomingMessage
+from codec import EventMessage, decode
+from logger import logger
+
+
+class Delivery:
+    """Acks an AMQP message once every event it carried has been applied.
+
+    A message whose events could not be applied is requeued once; when it
+    fails again on redelivery it is rejected, which drops it or, under a
+    dead-letter policy on the queue, dead-letters it.
+    """
+
+    def __init__(self, message: IncomingMessage, pending: int):
+        self.message = message
+        self.pending = pending
+        self.failed = False
+
+    async def done(self) -> None:
+        self.pending -= 1
+        if self.pending == 0 and not self.failed:
+            await self.message.ack()
+
+    async def fail(self) -> None:
+        if self.failed:
+            return
+        self.failed = True
+        if self.message.redelivered:
+            logger.error(
+                "Rejecting message {} after redelivery.", self.message.message_id
+            )
+            await self.message.reject(requeue=False)
+        else:
+            await self.message.nack(requeue=True)
+
+
+class EventConsumer:
+    """Applies event updates on concurrent workers with per-event ordering.
+
+    Every event is hashed by ``event_id`` onto one of ``lanes`` ordered lanes,
+    so updates of the same event are applied one after another while
+    different events proceed in parallel. Each lane applies up to
+    ``batch_size`` updates (or whatever arrived within ``batch_timeout_ms``)
+    per call to ``on_events``. Lanes hold at most ``lane_capacity`` updates,
+    which together with the channel prefetch bounds the work in flight.
+
+    A failed batch is retried up to ``max_attempts`` times with exponential
+    backoff from ``retry_backoff_ms``. If it still fails its updates are
+    applied one by one, so only the messages carrying an update that fails
+    on its own are given back to the broker.
+    """
+
+    def __init__(
+        self,
+        on_events: Callable[[list[EventMessage]], Awaitable[None]],
+        lanes: int,
+        batch_size: int,
+        batch_timeout_ms: int,
+        lane_capacity: int,
+        max_attempts: int,
+        retry_backoff_ms: int,
+    ):
+        self.on_events = on_events
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout_ms / 1000
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff_ms / 1000
+        self.lanes: list[asyncio.Queue[tuple[EventMessage, Delivery]]] = [
+            asyncio.Queue(maxsize=lane_capacity) for _ in range(lanes)
+        ]
+        self._workers: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start one worker per lane."""
+        self._workers = [
+            asyncio.create_task(self._run_lane(lane)) for lane in self.lanes
+        ]
+        logger.info(f"Started {len(self.lanes)} event consumer lanes.")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def lane_for(self, event_id: str) -> asyncio.Queue:
+        return self.lanes[zlib.crc32(event_id.encode()) % len(self.lanes)]
+
+    async def on_message(self, message: IncomingMessage) -> None:
+        """Decode a message and dispatch its events to their lanes."""
+        try:
+            batch = decode(message.body, message.content_type)
+        except Exception as e:
+            logger.error("Dropping undecodable message {}: {}", message.message_id, e)
+            await message.reject(requeue=False)
+            return
+        if not batch.events:
+            await message.ack()
+            return
+        delivery = Delivery(message, len(batch.events))
+        for event in batch.events:
+            await self.lane_for(event.event_id).put((event, delivery))
+
+    async def _run_lane(self, lane: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await lane.get()]
+            deadline = loop.time() + self.batch_timeout
+            while len(items) < self.batch_size:
+                if not lane.empty():
+                    items.append(lane.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(lane.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            latest: dict[str, EventMessage] = {}
+            for event, _ in items:
+                current = latest.get(event.event_id)
+                if current is None or current.version < event.version:
+                    latest[event.event_id] = event
+
+            events = list(latest.values())
+            failed = set()
+            if not await self._apply(events):
+                failed = await self._apply_each(events)
+            for event, delivery in items:
+                if event.event_id in failed:
+                    await delivery.fail()
+                else:
+                    await delivery.done()
+
+    async def _apply(self, events: list[EventMessage]) -> bool:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self.on_events(events)
+                return True
+            except Exception as e:
+                logger.error(
+                    "Failed to apply {} event updates (attempt {} of {}): {}",
+                    len(events),
+                    attempt,
+                    self.max_attempts,
+                    e,
+                )
+            if attempt < self.max_attempts:
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+        return False
+
+    async def _apply_each(self, events: list[EventMessage]) -> set[str]:
+        """Apply updates one at a time and return the ids of those that failed."""
+        failed = set()
+        for event in events:
+            try:
+                await self.on_events([event])
+            except Exception as e:
+                logger.error(
+                    "Failed to apply update of event {}: {}", event.event_id, e
+                )
+                failed.add(event.event_id)
+        return failed
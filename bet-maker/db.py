@@ -1,21 +1,190 @@
+import asyncio
+import time
+
 import punq
 from config import settings
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from logger import logger
+from metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_WAIT,
+    DB_POOL_WAITERS,
+    DB_REPLICA_LAG,
+)
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 
-engine = create_async_engine(settings.database_uri_async, echo=False)
+def make_engine(uri: str) -> AsyncEngine:
+    return create_async_engine(
+        uri,
+        echo=False,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_S,
+        pool_recycle=settings.DB_POOL_RECYCLE_S,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": {
+                "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS),
+            },
+        },
+    )
+
+
+engine = make_engine(settings.database_uri_async)
 session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+replica_engine = (
+    make_engine(settings.database_replica_uri_async)
+    if settings.database_replica_uri_async
+    else None
+)
+replica_session_maker = (
+    sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if replica_engine
+    else None
+)
+
 
 Base = declarative_base()
 
 
-class SessionMaker:
-    def __new__(cls):
-        return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+class PoolMetrics:
+    """Connection pool usage as seen by ``Transaction``.
+
+    ``waiters`` is the number of transactions currently waiting for a
+    connection; wait times cover the whole checkout, including pre-ping.
+    """
+
+    def __init__(self, slow_acquire_ms: int):
+        self.slow_acquire = slow_acquire_ms / 1000
+        self.waiters = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def observe_wait(self, seconds: float) -> None:
+        self.acquired += 1
+        self.wait_time_total += seconds
+        self.wait_time_max = max(self.wait_time_max, seconds)
+        DB_POOL_WAIT.observe(seconds)
+        if seconds >= self.slow_acquire:
+            logger.warning(
+                f"Waited {seconds:.3f}s for a database connection: {self.snapshot()}"
+            )
+
+    def snapshot(self) -> dict:
+        pool = engine.sync_engine.pool
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "waiters": self.waiters,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "wait_time_total_s": round(self.wait_time_total, 6),
+            "wait_time_max_s": round(self.wait_time_max, 6),
+        }
+
+
+pool_metrics = PoolMetrics(settings.DB_POOL_SLOW_ACQUIRE_MS)
+DB_POOL_CHECKED_OUT.set_function(lambda: engine.sync_engine.pool.checkedout())
+DB_POOL_OVERFLOW.set_function(lambda: max(engine.sync_engine.pool.overflow(), 0))
+DB_POOL_WAITERS.set_function(lambda: pool_metrics.waiters)
+
+
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery()"
+    " OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+class ReplicaRouter:
+    """Decides whether read-only transactions may use the replica.
+
+    The replica's replay lag is measured at most once per
+    ``check_interval_s``; while it exceeds ``max_lag_s``, or the replica
+    cannot be reached, read-only transactions fall back to the primary.
+    """
+
+    def __init__(
+        self,
+        replica_session_maker: sessionmaker | None,
+        max_lag_s: float,
+        check_interval_s: float,
+    ):
+        self.session_maker = replica_session_maker
+        self.max_lag = max_lag_s
+        self.check_interval = check_interval_s
+        self.healthy = replica_session_maker is not None
+        self.lag: float | None = None
+        self._checked_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    def _is_stale(self) -> bool:
+        return (
+            self._checked_at is None
+            or time.monotonic() - self._checked_at >= self.check_interval
+        )
+
+    async def choose(self) -> sessionmaker | None:
+        """Return the replica session factory, or None to use the primary."""
+        if self.session_maker is None:
+            return None
+        if self._is_stale():
+            await self.check()
+        return self.session_maker if self.healthy else None
+
+    async def check(self) -> None:
+        async with self._lock:
+            if not self._is_stale():
+                return
+            try:
+                async with self.session_maker() as session:
+                    self.lag = float((await session.execute(REPLICA_LAG_QUERY)).scalar())
+            except Exception as e:
+                self._set_healthy(False, f"replica is unreachable: {e}")
+            else:
+                self._set_healthy(
+                    self.lag <= self.max_lag, f"replica lag is {self.lag:.3f}s"
+                )
+            self._checked_at = time.monotonic()
+
+    def mark_failed(self, error: Exception) -> None:
+        """Send reads to the primary until the next lag check."""
+        self._set_healthy(False, f"replica connection failed: {error}")
+        self._checked_at = time.monotonic()
+
+    def _set_healthy(self, healthy: bool, reason: str) -> None:
+        if healthy != self.healthy:
+            target = "replica" if healthy else "primary"
+            logger.warning(f"Routing read-only transactions to the {target}: {reason}")
+        self.healthy = healthy
+
+    def snapshot(self) -> dict:
+        return {
+            "configured": self.session_maker is not None,
+            "healthy": self.healthy,
+            "lag_s": self.lag,
+        }
+
+
+replica_router = ReplicaRouter(
+    replica_session_maker,
+    settings.DB_REPLICA_MAX_LAG_S,
+    settings.DB_REPLICA_CHECK_INTERVAL_S,
+)
+DB_REPLICA_LAG.set_function(lambda: replica_router.lag or 0.0)
 
 
 container = punq.Container()
-container.register(sessionmaker, SessionMaker)
+container.register(sessionmaker, instance=session_maker)
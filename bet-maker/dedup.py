@@ -0,0 +1,74 @@
+import heapq
+from datetime import datetime, timedelta
+from typing import Iterable, Protocol
+
+from config import settings
+
+FINAL_STATES = ("FINISHED_WIN", "FINISHED_LOSE")
+
+
+class Versioned(Protocol):
+    event_id: str
+    version: int
+    deadline: datetime
+    state: str
+
+
+class HighWaterMarks:
+    """Highest applied version per event, kept in memory.
+
+    Lets the consumer drop duplicate and out-of-order updates before they
+    reach the database. The authoritative copy is ``events.version``, which
+    the conditional upsert still checks, so an event missing here (e.g. one
+    that finished before this process started) is only a cache miss.
+
+    Marks are dropped once an event is finished, and otherwise ``grace``
+    after its deadline, tracked by a heap of ``(deadline, event_id)``, so
+    only events that can still change are kept.
+    """
+
+    def __init__(self, grace: timedelta):
+        self.grace = grace
+        self.versions: dict[str, int] = {}
+        self.deadlines: dict[str, datetime] = {}
+        self._expiry: list[tuple[datetime, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+    def load(self, events: Iterable[Versioned]) -> None:
+        self.advance(events)
+
+    def is_fresh(self, event: Versioned) -> bool:
+        return event.version > self.versions.get(event.event_id, -1)
+
+    def filter(self, events: Iterable[Versioned]) -> list:
+        """Only the events newer than what has been applied so far."""
+        return [event for event in events if self.is_fresh(event)]
+
+    def advance(self, events: Iterable[Versioned]) -> None:
+        for event in events:
+            if not self.is_fresh(event):
+                continue
+            if event.state in FINAL_STATES:
+                self.versions.pop(event.event_id, None)
+                self.deadlines.pop(event.event_id, None)
+                continue
+            self.versions[event.event_id] = event.version
+            deadline = event.deadline.replace(tzinfo=None)
+            if self.deadlines.get(event.event_id) != deadline:
+                self.deadlines[event.event_id] = deadline
+                heapq.heappush(self._expiry, (deadline, event.event_id))
+        self.expire()
+
+    def expire(self) -> None:
+        """Drop the marks of events more than ``grace`` past their deadline."""
+        cutoff = datetime.now() - self.grace
+        while self._expiry and self._expiry[0][0] <= cutoff:
+            deadline, event_id = heapq.heappop(self._expiry)
+            if self.deadlines.get(event_id) == deadline:
+                del self.deadlines[event_id]
+                del self.versions[event_id]
+
+
+high_water_marks = HighWaterMarks(timedelta(seconds=settings.HIGH_WATER_MARK_GRACE_S))
@@ -1,50 +1,103 @@
 import asyncio
-from ast import literal_eval
+import time
 
 from fastapi import FastAPI
 from api import router as api_router
-from aio_pika import IncomingMessage
 from logger import logger
-from schemas import Message as MessageSchema
-from schemas import Event as EventSchema
-from models import Bet, Event
+from metrics import (
+    AMQP_CONSUMED_EVENTS,
+    AMQP_QUEUED_EVENTS,
+    EVENT_APPLY_DURATION,
+    EVENT_UPDATE_LAG,
+    MetricsMiddleware,
+)
+from codec import EventMessage
+from consumer import EventConsumer
+from models import Event, Settlement
 from transactions import Transaction
+from cache import event_cache
+from dedup import high_water_marks
+from services import event_hub, load_event_cache
+from settlement import settlement_engine
+from partitions import partition_maintainer
+from outbox import outbox_publisher, outbox_relay
 from rabbitmq import RabbitMQ
 from config import settings
 
 
-async def handle_message(message: IncomingMessage):
-    """Handle incoming messages."""
-    logger.info(f"Handling message: {message}")
-    message_dict = literal_eval(message.body.decode())
-    message = MessageSchema(**message_dict)
-    del message_dict["action"]
-    message_event = EventSchema(**message_dict)
-    async with Transaction():
-        if message.action == "update_status":
-            await Event.update_event_state(message_event)
-            await Bet.update_bet_status(message_event)
-            logger.info(f"Updated event status: {message_event}")
-        else:
-            await Event.create(message_event)
-            logger.info(f"Updated events: {message_event}")
+async def apply_events(events: list[EventMessage]):
+    """Apply event updates in a single transaction.
+
+    Updates at or below an event's high-water mark are duplicates or arrived
+    out of order, and are dropped without touching the database.
+    """
+    started = time.perf_counter()
+    fresh = high_water_marks.filter(events)
+    if fresh:
+        async with Transaction():
+            applied = await Event.create_many(fresh)
+            finished = await Settlement.schedule(applied)
+        if finished:
+            settlement_engine.notify()
+        applied_ids = {event.event_id for event in applied}
+        applied_events = [event for event in fresh if event.event_id in applied_ids]
+        high_water_marks.advance(applied_events)
+        event_cache.update(applied_events)
+        event_hub.publish(applied_events)
+        now_ns = time.time_ns()
+        for event in applied_events:
+            EVENT_UPDATE_LAG.observe(max(now_ns - event.version, 0) / 1e9)
+    else:
+        applied = []
+    EVENT_APPLY_DURATION.observe(time.perf_counter() - started)
+    AMQP_CONSUMED_EVENTS.labels("applied").inc(len(applied))
+    AMQP_CONSUMED_EVENTS.labels("stale").inc(len(events) - len(applied))
+    logger.debug(
+        "Applied {} of {} event updates, the rest were stale.",
+        len(applied),
+        len(events),
+    )
 
 
 async def consume_messages():
     """Consume messages from RabbitMQ."""
-    async with RabbitMQ(
-        settings.rabbitmq_url,
-        settings.RABBITMQ_QUEUE_NAME,
-        settings.RABBITMQ_EXCHANGE_NAME,
-    ) as rabbitmq:
-        await rabbitmq.receive_messages(handle_message)
+    consumer = EventConsumer(
+        apply_events,
+        settings.CONSUMER_LANES,
+        settings.CONSUMER_BATCH_SIZE,
+        settings.CONSUMER_BATCH_TIMEOUT_MS,
+        settings.CONSUMER_LANE_CAPACITY,
+        settings.CONSUMER_MAX_ATTEMPTS,
+        settings.CONSUMER_RETRY_BACKOFF_MS,
+    )
+    consumer.start()
+    AMQP_QUEUED_EVENTS.set_function(
+        lambda: sum(lane.qsize() for lane in consumer.lanes)
+    )
+    try:
+        async with RabbitMQ(
+            settings.rabbitmq_url,
+            settings.RABBITMQ_QUEUE_NAME,
+            settings.RABBITMQ_EXCHANGE_NAME,
+            settings.RABBITMQ_PREFETCH_COUNT,
+        ) as rabbitmq:
+            await rabbitmq.receive_messages(consumer.on_message, manual_ack=True)
+    finally:
+        await consumer.stop()
 
 
 app = FastAPI()
+app.add_middleware(MetricsMiddleware)
 app.include_router(api_router)
 
 
 @app.on_event("startup")
 async def on_startup():
     await asyncio.sleep(15)
+    await load_event_cache()
+    await partition_maintainer.create_partitions()
+    await outbox_publisher.connect()
+    asyncio.create_task(outbox_relay.run())
+    asyncio.create_task(settlement_engine.run())
+    asyncio.create_task(partition_maintainer.run())
     asyncio.create_task(consume_messages())
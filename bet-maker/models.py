@@ -1,38 +1,71 @@
-from typing import Literal
+import re
+from typing import AsyncIterator, Awaitable, Callable, Literal
 from uuid import UUID
 
 from sqlalchemy import (
+    BigInteger,
+    case,
     Enum,
+    cast,
+    delete,
+    exists,
     ForeignKey,
+    Identity,
+    Index,
+    LargeBinary,
+    literal,
     select,
+    Select,
+    func,
+    text,
+    true,
+    tuple_,
     update,
+    Update,
     Numeric,
+    Row,
 )
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
-from schemas import Event, Bet
+from decimal import Decimal
+from codec import EventMessage
+from schemas import Event, Bet, BetFilter
 from transactions import db_session
 
 Base = declarative_base()
 
 
-EventStateLiteral = Literal["NEW", "FINISHED_WIN", "FINISHED_LOSE"]
+EventStateLiteral = Literal["NEW", "CLOSED", "FINISHED_WIN", "FINISHED_LOSE"]
 BetStatusLiteral = Literal["PENDING", "WON", "LOSE"]
 
+# Keeps multi-row statements well below the 32767 bind parameter limit.
+UPSERT_CHUNK_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+BETS_PARTITION_NAME = re.compile(r"^bets_p(\d{4})_(\d{2})$")
+
 
 class Event(Base):
     __tablename__ = "events"
 
-    event_id: Mapped[str] = mapped_column(primary_key=True, index=True)
+    __table_args__ = (
+        Index(
+            "ix_events_open_deadline",
+            "deadline",
+            postgresql_where=text("state = 'NEW'"),
+        ),
+    )
+
+    event_id: Mapped[str] = mapped_column(primary_key=True)
     deadline: Mapped[datetime] = mapped_column(nullable=False)  # type: ignore
     state: Mapped[EventStateLiteral] = mapped_column(
-        Enum("NEW", "FINISHED_WIN", "FINISHED_LOSE", name="eventstate"),
+        Enum("NEW", "CLOSED", "FINISHED_WIN", "FINISHED_LOSE", name="eventstate"),
         default="1",
         nullable=False,
     )
     coefficient: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
+    version: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
 
     bets = relationship("Bet", back_populates="event")
 
@@ -40,65 +73,115 @@ class Event(Base):
         return f"<Event(event_id={self.event_id}, state={self.state}, deadline={self.deadline}, coefficient={self.coefficient})>"
 
     @classmethod
-    async def create(cls, data: Event) -> None:
-        data.deadline = data.deadline.replace(tzinfo=None)
-        values = data.model_dump()
-        stmt = insert(cls).values(values)
-        update_dict = {
-            field: getattr(data, field) for field in values if values[field] is not None
-        }
-        stmt = stmt.on_conflict_do_update(index_elements=["event_id"], set_=update_dict)
-        await db_session.get().execute(stmt)
+    async def create_many(cls, data: list[EventMessage]) -> list[Row]:
+        """Upsert events with one multi-row statement, skipping stale versions.
+
+        ``data`` must hold at most one message per event. Returns the
+        ``event_id`` and ``state`` of the rows that were actually written.
+        """
+        applied = []
+        for start in range(0, len(data), UPSERT_CHUNK_SIZE):
+            values = [
+                {
+                    "event_id": message.event_id,
+                    "deadline": message.deadline.replace(tzinfo=None),
+                    "state": message.state,
+                    "coefficient": message.coefficient,
+                    "version": message.version,
+                }
+                for message in data[start : start + UPSERT_CHUNK_SIZE]
+            ]
+            stmt = insert(cls).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["event_id"],
+                set_={field: stmt.excluded[field] for field in values[0]},
+                where=cls.version < stmt.excluded.version,
+            ).returning(cls.event_id, cls.state)
+            applied.extend((await db_session.get().execute(stmt)).all())
+        return applied
 
     @classmethod
-    async def get_event_by_id(cls, event_id: str) -> Event:
-        event = (
-            (
-                await db_session.get().execute(
-                    select(Event).filter(Event.event_id == event_id)
-                )
-            )
-            .scalars()
-            .all()
+    def select_events_for_betting(cls) -> Select:
+        return (
+            select(Event)
+            .filter(Event.deadline > datetime.now())
+            .filter(Event.state == "NEW")
+            .order_by(Event.deadline)
         )
-        return event
 
     @classmethod
     async def get_events_for_betting(cls) -> list[Event]:
-        now = datetime.now()
         events = (
-            (
-                await db_session.get().execute(
-                    select(Event)
-                    .filter(Event.deadline > now)
-                    .filter(Event.state == "NEW")
-                )
-            )
+            (await db_session.get().execute(cls.select_events_for_betting()))
             .scalars()
             .all()
         )
         return events
 
     @classmethod
-    async def update_event_state(cls, event: Event) -> None:
-        stmt = (
-            update(Event)
-            .where(Event.event_id == event.event_id)
-            .values(state=event.state)
+    async def get_coefficients_for_betting(
+        cls, event_ids: list[str]
+    ) -> dict[str, Decimal]:
+        """Coefficients of the given events that are open for betting.
+
+        The rows are share-locked so they cannot close before the transaction
+        inserting the bets commits.
+        """
+        rows = await db_session.get().execute(
+            select(Event.event_id, Event.coefficient)
+            .filter(Event.event_id.in_(event_ids))
+            .filter(Event.deadline > datetime.now())
+            .filter(Event.state == "NEW")
+            .with_for_update(read=True)
         )
-        await db_session.get().execute(stmt)
+        return dict(rows.all())
+
+
+class BetId(Base):
+    """Every ``bet_id`` in ``bets``, in a table that is not partitioned.
+
+    The primary key of ``bets`` has to include the partition key, so it can
+    not keep ``bet_id`` unique on its own. Bets are only inserted after their
+    id was claimed here, which serializes concurrent inserts of the same bet.
+    """
+
+    __tablename__ = "bet_ids"
+
+    __table_args__ = (Index("ix_bet_ids_created_at", "created_at"),)
+
+    bet_id: Mapped[UUID] = mapped_column(primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(nullable=False)
+
+    def __repr__(self):
+        return f"<BetId(bet_id={self.bet_id}, created_at={self.created_at})>"
 
 
 class Bet(Base):
+    """A bet, stored in monthly ``created_at`` range partitions.
+
+    The primary key has to include the partition key, so ``bet_id``
+    uniqueness is enforced through ``bet_ids``.
+    """
+
     __tablename__ = "bets"
 
-    bet_id: Mapped[UUID] = mapped_column(primary_key=True, index=True)
+    __table_args__ = (
+        Index("ix_bets_event_id_status", "event_id", "status"),
+        Index("ix_bets_created_at_bet_id", "created_at", "bet_id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    bet_id: Mapped[UUID] = mapped_column(primary_key=True)
     event_id: Mapped[str] = mapped_column(ForeignKey("events.event_id"), nullable=False)
     amount: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
     status: Mapped[BetStatusLiteral] = mapped_column(
         Enum("PENDING", "WON", "LOSE", name="betstatus"), default="1", nullable=False
     )
-    created_at: Mapped[datetime] = mapped_column(default=datetime.now, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        default=datetime.now, primary_key=True
+    )
+    coefficient: Mapped[float | None] = mapped_column(Numeric(10, 2), nullable=True)
+    payout: Mapped[float | None] = mapped_column(Numeric(12, 2), nullable=True)
 
     event = relationship("Event", back_populates="bets")
 
@@ -106,31 +189,371 @@ class Bet(Base):
         return f"<Bet(bet_id={self.bet_id}, event_id={self.event_id}, amount={self.amount}, status={self.status})>"
 
     @classmethod
-    async def create(cls, data: Bet) -> None:
-        values = data.model_dump()
+    async def create(cls, data: Bet) -> Decimal | None:
+        """Insert the bet only if its event is still open for betting.
+
+        The event check, the claim of the ``bet_id`` and the insert are a
+        single statement; returns the accepted coefficient, or ``None`` if the
+        event is closed or the bet already exists. The event row is
+        share-locked, as in ``get_coefficients_for_betting``, so it can not
+        finish and be settled before the bet commits.
+        """
+        now = datetime.now()
+        open_event = (
+            select(Event.event_id, Event.coefficient)
+            .where(
+                Event.event_id == data.event_id,
+                Event.state == "NEW",
+                Event.deadline > now,
+            )
+            .with_for_update(read=True)
+            .cte("open_event")
+        )
+        claimed = (
+            insert(BetId)
+            .from_select(
+                ["bet_id", "created_at"],
+                select(
+                    cast(literal(data.bet_id), BetId.bet_id.type),
+                    cast(literal(now), BetId.created_at.type),
+                ).select_from(open_event),
+            )
+            .on_conflict_do_nothing()
+            .returning(BetId.bet_id, BetId.created_at)
+            .cte("claimed")
+        )
+        source = select(
+            claimed.c.bet_id,
+            open_event.c.event_id,
+            cast(literal(data.amount), cls.amount.type),
+            cast(literal(data.status), cls.status.type),
+            claimed.c.created_at,
+            open_event.c.coefficient,
+        ).select_from(claimed.join(open_event, true()))
+        stmt = (
+            insert(cls)
+            .from_select(
+                ["bet_id", "event_id", "amount", "status", "created_at", "coefficient"],
+                source,
+            )
+            .returning(cls.coefficient)
+        )
+        return (await db_session.get().execute(stmt)).scalar_one_or_none()
+
+    @classmethod
+    async def create_many(
+        cls, data: list[Bet], coefficients: dict[str, Decimal]
+    ) -> set[UUID]:
+        """Insert bets with multi-row statements at the given coefficients.
+
+        Bets whose ``bet_id`` is already claimed in ``bet_ids`` are skipped;
+        returns the ids of the inserted bets.
+        """
+        session = db_session.get()
+        now = datetime.now()
+        inserted = set()
+        for start in range(0, len(data), UPSERT_CHUNK_SIZE):
+            chunk = data[start : start + UPSERT_CHUNK_SIZE]
+            claimed = set(
+                (
+                    await session.execute(
+                        insert(BetId)
+                        .values(
+                            [{"bet_id": bet.bet_id, "created_at": now} for bet in chunk]
+                        )
+                        .on_conflict_do_nothing()
+                        .returning(BetId.bet_id)
+                    )
+                ).scalars()
+            )
+            values = [
+                {
+                    **bet.model_dump(),
+                    "created_at": now,
+                    "coefficient": coefficients[bet.event_id],
+                }
+                for bet in chunk
+                if bet.bet_id in claimed
+            ]
+            if not values:
+                continue
+            await session.execute(insert(cls).values(values))
+            inserted.update(claimed)
+        return inserted
+
+    @classmethod
+    def select_bets(
+        cls, filters: BetFilter, after: tuple[datetime, UUID] | None = None
+    ) -> Select:
+        """Filtered bets in keyset order, starting after the ``after`` key."""
+        stmt = select(Bet).order_by(Bet.created_at, Bet.bet_id)
+        if filters.event_id is not None:
+            stmt = stmt.filter(Bet.event_id == filters.event_id)
+        if filters.status is not None:
+            stmt = stmt.filter(Bet.status == filters.status)
+        if filters.created_from is not None:
+            stmt = stmt.filter(Bet.created_at >= filters.created_from)
+        if filters.created_to is not None:
+            stmt = stmt.filter(Bet.created_at < filters.created_to)
+        if after is not None:
+            stmt = stmt.filter(tuple_(Bet.created_at, Bet.bet_id) > tuple_(*after))
+        return stmt
+
+    @classmethod
+    async def get_bets(
+        cls,
+        filters: BetFilter,
+        limit: int,
+        after: tuple[datetime, UUID] | None = None,
+    ) -> list["Bet"]:
+        stmt = cls.select_bets(filters, after).limit(limit)
+        bets = (await db_session.get().execute(stmt)).scalars().all()
+        return bets
+
+    @classmethod
+    async def stream_bets(
+        cls, filters: BetFilter, after: tuple[datetime, UUID] | None = None
+    ) -> AsyncIterator["Bet"]:
+        """Yield bets from a server-side cursor, ``yield_per`` rows at a time."""
+        stmt = cls.select_bets(filters, after).execution_options(
+            yield_per=STREAM_CHUNK_SIZE
+        )
+        async for bet in await db_session.get().stream_scalars(stmt):
+            yield bet
+
+    @classmethod
+    def settle_chunk(
+        cls, event_id: str, status: BetStatusLiteral, chunk_size: int
+    ) -> Update:
+        """Settle up to ``chunk_size`` pending bets of an event, paying winners.
+
+        Rows locked by another settler are skipped rather than waited for.
+        Winning bets pay out at their accepted coefficient, falling back to
+        the event coefficient for bets placed before it was recorded.
+        """
+        chunk = (
+            select(Bet.bet_id)
+            .where(Bet.event_id == event_id)
+            .where(Bet.status == "PENDING")
+            .limit(chunk_size)
+            .with_for_update(skip_locked=True)
+        )
+        payout = (
+            Bet.amount * func.coalesce(Bet.coefficient, Event.coefficient)
+            if status == "WON"
+            else literal(0)
+        )
+        return (
+            update(Bet)
+            .where(Bet.bet_id.in_(chunk.scalar_subquery()))
+            .where(Event.event_id == Bet.event_id)
+            .values(status=status, payout=payout)
+            .returning(
+                Bet.bet_id,
+                Bet.event_id,
+                Bet.amount,
+                Bet.status,
+                Bet.coefficient,
+                Bet.payout,
+            )
+        )
+
+    @classmethod
+    async def create_partition(cls, start: datetime, end: datetime) -> str:
+        """Create the partition for bets placed in ``[start, end)``."""
+        name = f"bets_p{start:%Y_%m}"
+        await db_session.get().execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF bets "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+            )
+        )
+        return name
+
+    @classmethod
+    async def get_partitions(cls) -> dict[str, datetime]:
+        """Monthly partitions of ``bets`` by name, with the month they hold."""
+        rows = await db_session.get().execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'bets'::regclass"
+            )
+        )
+        partitions = {}
+        for name in rows.scalars():
+            match = BETS_PARTITION_NAME.match(name)
+            if match:
+                partitions[name] = datetime(int(match[1]), int(match[2]), 1)
+        return partitions
+
+    @classmethod
+    async def archive_partition(
+        cls, name: str, write: Callable[[bytes], Awaitable[None]]
+    ) -> bool:
+        """Copy a fully settled partition out as CSV, then detach and drop it.
+
+        The partition is share-locked while it is copied, and the parent is
+        locked only for the final detach. The claimed ids of its bets are
+        released from ``bet_ids`` along with it. Returns ``False`` without touching
+        the partition if it still holds pending bets.
+        """
+        match = BETS_PARTITION_NAME.match(name)
+        if not match:
+            raise ValueError(f"Not a bets partition: {name}")
+        year, month = int(match[1]), int(match[2])
+        session = db_session.get()
+        await session.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+        pending = await session.execute(
+            text(f"SELECT EXISTS (SELECT 1 FROM {name} WHERE status = 'PENDING')")
+        )
+        if pending.scalar():
+            return False
+        connection = await (await session.connection()).get_raw_connection()
+        await connection.driver_connection.copy_from_table(
+            name, output=write, format="csv", header=True
+        )
+        await session.execute(text(f"ALTER TABLE bets DETACH PARTITION {name}"))
+        await session.execute(text(f"DROP TABLE {name}"))
+        await session.execute(
+            delete(BetId).where(
+                BetId.created_at >= datetime(year, month, 1),
+                BetId.created_at < datetime(year + month // 12, month % 12 + 1, 1),
+            )
+        )
+        return True
+
+
+class Settlement(Base):
+    """Progress of settling the bets of one finished event."""
+
+    __tablename__ = "settlements"
+
+    event_id: Mapped[str] = mapped_column(
+        ForeignKey("events.event_id"), primary_key=True
+    )
+    status: Mapped[BetStatusLiteral] = mapped_column(
+        Enum("PENDING", "WON", "LOSE", name="betstatus"), nullable=False
+    )
+    settled_count: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    started_at: Mapped[datetime] = mapped_column(default=datetime.now, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.now, nullable=False)
+    completed_at: Mapped[datetime | None] = mapped_column(nullable=True)
+
+    def __repr__(self):
+        return f"<Settlement(event_id={self.event_id}, status={self.status}, settled_count={self.settled_count}, completed_at={self.completed_at})>"
+
+    @classmethod
+    async def schedule(cls, events: list[Row]) -> int:
+        """Record a settlement job for every finished event.
+
+        Runs in the same transaction as the event update, so a finished event
+        is never lost between the consumer and the settlement engine.
+        """
+        results = {"FINISHED_WIN": "WON", "FINISHED_LOSE": "LOSE"}
+        now = datetime.now()
+        values = [
+            {
+                "event_id": event.event_id,
+                "status": results[event.state],
+                "started_at": now,
+                "updated_at": now,
+            }
+            for event in events
+            if event.state in results
+        ]
+        if not values:
+            return 0
         stmt = insert(cls).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["event_id"],
+            set_={
+                "status": stmt.excluded.status,
+                "updated_at": stmt.excluded.updated_at,
+                "completed_at": None,
+            },
+        )
         await db_session.get().execute(stmt)
+        return len(values)
 
     @classmethod
-    async def get_bets(cls) -> list[Event]:
-        bets = (await db_session.get().execute(select(Bet))).scalars().all()
-        return bets
+    async def get_unfinished(cls) -> list["Settlement"]:
+        stmt = (
+            select(Settlement)
+            .where(Settlement.completed_at.is_(None))
+            .order_by(Settlement.updated_at)
+        )
+        return (await db_session.get().execute(stmt)).scalars().all()
 
     @classmethod
-    async def update_bet_status(cls, event: Event) -> None:
-        if event.state == "FINISHED_WIN":
-            stmt = (
-                update(Bet)
-                .where(Bet.event_id == event.event_id)
-                .where(Bet.status == "PENDING")
-                .values(status="WON")
+    async def run_chunk(cls, settlement: "Settlement", chunk_size: int) -> list[Bet]:
+        """Settle one chunk of bets and record the progress; returns the bets.
+
+        The settlement is marked complete, in the same transaction, once the
+        event has no pending bets left. A short chunk alone is not enough:
+        bets skipped while locked by another settler are still pending.
+        """
+        session = db_session.get()
+        settled = (
+            await session.execute(
+                Bet.settle_chunk(settlement.event_id, settlement.status, chunk_size)
             )
-            await db_session.get().execute(stmt)
-        elif event.state == "FINISHED_LOSE":
-            stmt = (
-                update(Bet)
-                .where(Bet.event_id == event.event_id)
-                .where(Bet.status == "PENDING")
-                .values(status="LOSE")
+        ).all()
+        now = datetime.now()
+        await session.execute(
+            update(Settlement)
+            .where(Settlement.event_id == settlement.event_id)
+            .values(
+                settled_count=Settlement.settled_count + len(settled),
+                updated_at=now,
+                completed_at=case(
+                    (
+                        ~exists().where(
+                            Bet.event_id == settlement.event_id,
+                            Bet.status == "PENDING",
+                        ),
+                        now,
+                    ),
+                    else_=None,
+                ),
             )
-            await db_session.get().execute(stmt)
+        )
+        return settled
+
+
+class OutboxMessage(Base):
+    """Message to publish, written in the transaction that produced it."""
+
+    __tablename__ = "outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    routing_key: Mapped[str] = mapped_column(nullable=False)
+    body: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.now, nullable=False)
+
+    def __repr__(self):
+        return f"<OutboxMessage(id={self.id}, routing_key={self.routing_key}, created_at={self.created_at})>"
+
+    @classmethod
+    async def add(cls, routing_key: str, body: bytes) -> None:
+        stmt = insert(cls).values(
+            routing_key=routing_key, body=body, created_at=datetime.now()
+        )
+        await db_session.get().execute(stmt)
+
+    @classmethod
+    async def claim(cls, limit: int) -> list["OutboxMessage"]:
+        """Lock the oldest messages that no other relay is publishing."""
+        stmt = (
+            select(OutboxMessage)
+            .order_by(OutboxMessage.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return (await db_session.get().execute(stmt)).scalars().all()
+
+    @classmethod
+    async def delete(cls, ids: list[int]) -> None:
+        await db_session.get().execute(
+            delete(OutboxMessage).where(OutboxMessage.id.in_(ids))
+        )
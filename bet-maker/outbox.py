@@ -0,0 +1,138 @@
+import asyncio
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Protocol
+from uuid import UUID
+
+import msgspec
+from config import settings
+from logger import logger
+from metrics import OUTBOX_PUBLISH_DURATION, OUTBOX_RELAYED_MESSAGES
+from models import OutboxMessage
+from rabbitmq import RabbitMQPublisher
+from transactions import Transaction
+
+BET_ACCEPTED = "bet.accepted"
+BET_SETTLED = "bet.settled"
+
+
+class BetLike(Protocol):
+    bet_id: UUID
+    event_id: str
+    amount: Decimal
+    status: str
+
+
+class BetRecord(msgspec.Struct):
+    bet_id: UUID
+    event_id: str
+    amount: Decimal
+    status: str
+    coefficient: Decimal | None = None
+    payout: Decimal | None = None
+
+
+class BetsMessage(msgspec.Struct, tag=1, tag_field="schema_version"):
+    """Wire format of the bets exchange, version 1."""
+
+    created_at: datetime
+    bets: list[BetRecord]
+
+
+_encoder = msgspec.json.Encoder()
+
+
+async def enqueue_bets(
+    routing_key: str,
+    bets: Iterable[BetLike],
+    coefficients: dict[str, Decimal] | None = None,
+) -> None:
+    """Write one outbox message for the bets in the current transaction.
+
+    Coefficients are taken from the bets themselves unless ``coefficients``
+    maps each ``event_id`` to the accepted one.
+    """
+    records = [
+        BetRecord(
+            bet_id=bet.bet_id,
+            event_id=bet.event_id,
+            amount=bet.amount,
+            status=bet.status,
+            coefficient=(
+                coefficients[bet.event_id]
+                if coefficients is not None
+                else getattr(bet, "coefficient", None)
+            ),
+            payout=getattr(bet, "payout", None),
+        )
+        for bet in bets
+    ]
+    if records:
+        body = _encoder.encode(BetsMessage(created_at=datetime.now(), bets=records))
+        await OutboxMessage.add(routing_key, body)
+
+
+class OutboxRelay:
+    """Drains the outbox table to RabbitMQ in batches.
+
+    Each batch is claimed with ``SKIP LOCKED``, published with publisher
+    confirms and deleted in the same transaction, so a message is removed only
+    after the broker has accepted it (delivery is at least once; the outbox
+    id is sent as the AMQP message id for deduplication downstream).
+    """
+
+    def __init__(
+        self, publisher: RabbitMQPublisher, batch_size: int, poll_interval: float
+    ):
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+
+    def notify(self) -> None:
+        """Wake the relay up after outbox messages were committed."""
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        logger.info("Outbox relay started.")
+        while True:
+            self._wakeup.clear()
+            try:
+                while await self.relay_batch() == self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"Outbox relay failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def relay_batch(self) -> int:
+        """Publish and delete one batch; returns the number of messages."""
+        async with Transaction():
+            messages = await OutboxMessage.claim(self.batch_size)
+            if not messages:
+                return 0
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    self.publisher.send_message(
+                        message.body, message.routing_key, str(message.id)
+                    )
+                    for message in messages
+                )
+            )
+            OUTBOX_PUBLISH_DURATION.observe(time.perf_counter() - started)
+            await OutboxMessage.delete([message.id for message in messages])
+        OUTBOX_RELAYED_MESSAGES.inc(len(messages))
+        logger.debug("Relayed {} outbox messages.", len(messages))
+        return len(messages)
+
+
+outbox_publisher = RabbitMQPublisher(
+    settings.rabbitmq_url, settings.RABBITMQ_OUTBOX_EXCHANGE_NAME
+)
+outbox_relay = OutboxRelay(
+    outbox_publisher, settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_POLL_INTERVAL_S
+)
@@ -0,0 +1,123 @@
+import asyncio
+import gzip
+import os
+from datetime import datetime
+from pathlib import Path
+
+from config import settings
+from logger import logger
+from models import Bet
+from transactions import Transaction
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def replace(source: Path, target: Path) -> None:
+    """Atomically rename ``source`` to ``target`` and sync the directory."""
+    os.replace(source, target)
+    directory = os.open(target.parent, os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+class PartitionMaintainer:
+    """Keeps the monthly partitions of ``bets`` in shape.
+
+    Partitions for the current month and the next ``months_ahead`` months
+    are created in advance, so inserts never land in the default partition.
+    Partitions older than ``retention_months`` whose bets are all settled are
+    written to ``archive_dir`` as gzip-compressed CSV and dropped, leaving
+    only recent history in the table and its indexes.
+    """
+
+    def __init__(
+        self,
+        months_ahead: int,
+        retention_months: int,
+        archive_dir: str,
+        interval: float,
+    ):
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.archive_dir = Path(archive_dir)
+        self.interval = interval
+
+    async def run(self) -> None:
+        logger.info("Partition maintenance started.")
+        while True:
+            try:
+                await self.create_partitions()
+                await self.archive_partitions()
+            except Exception as e:
+                logger.error(f"Partition maintenance failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def create_partitions(self) -> None:
+        month = month_start(datetime.now())
+        async with Transaction():
+            for offset in range(self.months_ahead + 1):
+                start = add_months(month, offset)
+                await Bet.create_partition(start, add_months(start, 1))
+
+    async def archive_partitions(self) -> list[Path]:
+        """Archive every expired, fully settled partition; returns the files."""
+        cutoff = add_months(month_start(datetime.now()), -self.retention_months)
+        async with Transaction():
+            partitions = await Bet.get_partitions()
+        archived = []
+        for name, month in sorted(partitions.items(), key=lambda item: item[1]):
+            if month >= cutoff:
+                continue
+            path = await self.archive_partition(name)
+            if path is not None:
+                archived.append(path)
+        return archived
+
+    async def archive_partition(self, name: str) -> Path | None:
+        """Archive one partition; returns the file, or ``None`` if it was kept.
+
+        The archive is written to a temporary file, synced and renamed into
+        place before the transaction dropping the partition commits, so a
+        crash never leaves a truncated file under the final name or a dropped
+        partition without its archive.
+        """
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self.archive_dir / f"{name}.csv.gz"
+        partial = path.with_name(f"{path.name}.tmp")
+        try:
+            async with Transaction():
+                with open(partial, "wb") as file:
+                    with gzip.GzipFile(fileobj=file, mode="wb") as archive:
+
+                        async def write(chunk: bytes) -> None:
+                            await asyncio.to_thread(archive.write, chunk)
+
+                        done = await Bet.archive_partition(name, write)
+                    if done:
+                        await asyncio.to_thread(os.fsync, file.fileno())
+                if done:
+                    await asyncio.to_thread(replace, partial, path)
+        finally:
+            partial.unlink(missing_ok=True)
+        if not done:
+            logger.info(f"Partition {name} still has pending bets, not archiving.")
+            return None
+        logger.info(f"Archived partition {name} to {path}.")
+        return path
+
+
+partition_maintainer = PartitionMaintainer(
+    settings.BETS_PARTITION_MONTHS_AHEAD,
+    settings.BETS_PARTITION_RETENTION_MONTHS,
+    settings.BETS_ARCHIVE_DIR,
+    settings.PARTITION_MAINTENANCE_INTERVAL_S,
+)
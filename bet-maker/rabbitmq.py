@@ -2,14 +2,23 @@ import asyncio
 from typing import Any, Callable
 import aio_pika
 from aio_pika import ExchangeType, Message, IncomingMessage
+from aio_pika.abc import AbstractChannel
+from aio_pika.pool import Pool
 from logger import logger
 
 
 class RabbitMQ:
-    def __init__(self, host: str, queue_name: str, exchange_name: str):
+    def __init__(
+        self,
+        host: str,
+        queue_name: str,
+        exchange_name: str,
+        prefetch_count: int | None = None,
+    ):
         self.host = host
         self.queue_name = queue_name
         self.exchange_name = exchange_name
+        self.prefetch_count = prefetch_count
         self.connection = None
         self.channel = None
         self.queue = None
@@ -23,6 +32,8 @@ class RabbitMQ:
         try:
             self.connection = await aio_pika.connect_robust(self.host)
             self.channel = await self.connection.channel()
+            if self.prefetch_count:
+                await self.channel.set_qos(prefetch_count=self.prefetch_count)
 
             self.exchange = await self.channel.declare_exchange(
                 self.exchange_name, ExchangeType.FANOUT, durable=True
@@ -35,19 +46,26 @@ class RabbitMQ:
             logger.error(f"Failed to connect to RabbitMQ: {e}")
             raise
 
-    async def receive_messages(self, on_message: Callable[[IncomingMessage], Any]):
-        """Receives and processes messages from the queue."""
+    async def receive_messages(
+        self, on_message: Callable[[IncomingMessage], Any], manual_ack: bool = False
+    ):
+        """Receives and processes messages from the queue.
+
+        With ``manual_ack`` the callback is responsible for acking each message.
+        """
         if not self.queue:
             logger.error("Attempted to receive messages without an active queue.")
             raise ConnectionError("No queue available. Call 'connect' first.")
 
         async def callback(message: IncomingMessage):
             async with message.process():
-                logger.info(f"Received message: {message.body.decode()}")
+                logger.opt(lazy=True).debug(
+                    "Received message: {}", lambda: message.body.decode()
+                )
                 await on_message(message)
 
         try:
-            await self.queue.consume(callback)
+            await self.queue.consume(on_message if manual_ack else callback)
             logger.info("Started consuming messages.")
             await asyncio.Future()
         except Exception as e:
@@ -71,3 +89,69 @@ class RabbitMQ:
     async def __aexit__(self, exc_type, exc, tb):
         """Support for asynchronous context manager for automatic connection closure."""
         await self.close()
+
+
+class RabbitMQPublisher:
+    """Long-lived publisher to a topic exchange with a pool of confirm channels."""
+
+    def __init__(self, host: str, exchange_name: str, pool_size: int = 4):
+        self.host = host
+        self.exchange_name = exchange_name
+        self.pool_size = pool_size
+        self.connection = None
+        self.channel_pool: Pool[AbstractChannel] | None = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.channel_pool is not None and not self.channel_pool.is_closed
+
+    async def connect(self):
+        """Establish a connection, declare the exchange and create a channel pool."""
+        try:
+            self.connection = await aio_pika.connect_robust(self.host)
+            async with self.connection.channel() as channel:
+                await channel.declare_exchange(
+                    self.exchange_name, ExchangeType.TOPIC, durable=True
+                )
+            self.channel_pool = Pool(self._create_channel, max_size=self.pool_size)
+            logger.info(f"Connected publisher to exchange '{self.exchange_name}'.")
+        except Exception as e:
+            logger.error(f"Failed to connect to RabbitMQ: {e}")
+            raise
+
+    async def _create_channel(self) -> AbstractChannel:
+        return await self.connection.channel(publisher_confirms=True)
+
+    async def send_message(
+        self,
+        body: bytes,
+        routing_key: str,
+        message_id: str | None = None,
+        content_type: str = "application/json",
+    ):
+        """Sending message to exchange and waiting for the broker confirm."""
+        if not self.is_connected:
+            raise ConnectionError("No connection established. Call 'connect' first.")
+        async with self.channel_pool.acquire() as channel:
+            exchange = await channel.get_exchange(self.exchange_name, ensure=False)
+            await exchange.publish(
+                Message(
+                    body=body,
+                    content_type=content_type,
+                    message_id=message_id,
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                ),
+                routing_key=routing_key,
+            )
+
+    async def close(self):
+        """Closing channel pool and connection."""
+        if self.channel_pool:
+            await self.channel_pool.close()
+            self.channel_pool = None
+        if self.connection:
+            try:
+                await self.connection.close()
+                logger.info("RabbitMQ publisher connection closed.")
+            except Exception as e:
+                logger.error(f"Failed to close RabbitMQ connection: {e}")
@@ -1,26 +1,22 @@
 import uuid
 from datetime import datetime
 from decimal import Decimal
-from typing import Literal
+from typing import List, Literal
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 class Event(BaseModel):
     event_id: str
     coefficient: Decimal
     deadline: datetime
-    state: Literal["NEW", "FINISHED_WIN", "FINISHED_LOSE"]
+    state: Literal["NEW", "CLOSED", "FINISHED_WIN", "FINISHED_LOSE"]
 
     class Config:
         from_attributes = True
 
 
-class Message(Event):
-    action: str
-
-
 class Bet(BaseModel):
     bet_id: UUID = Field(..., default_factory=uuid.uuid4)
     event_id: str
@@ -33,3 +29,40 @@ class Bet(BaseModel):
 
 class BetCreateMessage(Bet):
     message: str
+    coefficient: Decimal
+
+
+class BetBatchItemResult(BaseModel):
+    bet_id: UUID
+    accepted: bool
+    coefficient: Decimal | None = None
+    detail: str | None = None
+
+
+class BetBatchResult(BaseModel):
+    results: List[BetBatchItemResult]
+
+
+class BetFilter(BaseModel):
+    event_id: str | None = None
+    status: Literal["PENDING", "WON", "LOSE"] | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+
+    @field_validator("created_from", "created_to")
+    @classmethod
+    def to_naive(cls, value: datetime | None) -> datetime | None:
+        """Aware bounds are converted to the naive local time bets are stored in."""
+        if value is None or value.tzinfo is None:
+            return value
+        return value.astimezone().replace(tzinfo=None)
+
+
+class BetRead(Bet):
+    created_at: datetime
+    coefficient: Decimal | None = None
+
+
+class BetsPage(BaseModel):
+    bets: List[BetRead]
+    next_cursor: str | None = None
@@ -1,39 +1,200 @@
+import base64
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, List
+from uuid import UUID
+
+import msgspec
 
 from pydantic import TypeAdapter
 from fastapi import HTTPException
 from transactions import Transaction
-from schemas import Event as EventSchema
+from db import pool_metrics, replica_router
+from config import settings
+from cache import event_cache
+from hub import EventHub
+from metrics import STREAM_SUBSCRIBERS, render
+from dedup import high_water_marks
 from schemas import Bet as BetSchema, BetCreateMessage
+from schemas import BetBatchItemResult, BetBatchResult
+from schemas import BetFilter, BetRead, BetsPage
 from models import Event, Bet
+from outbox import BET_ACCEPTED, enqueue_bets, outbox_relay
+
+event_hub = EventHub(settings.STREAM_MAX_PENDING, settings.STREAM_KEEPALIVE_S)
+STREAM_SUBSCRIBERS.set_function(lambda: len(event_hub.subscribers))
 
 
-async def processing_get_events() -> List[EventSchema]:
-    """Getting all events that are still active. (deadline has not passed)"""
+async def load_event_cache() -> None:
+    """Filling the event cache and high-water marks with the open events."""
     async with Transaction():
         events = await Event.get_events_for_betting()
-    return TypeAdapter(list[EventSchema]).validate_python(events)
+    event_cache.update(events)
+    high_water_marks.load(events)
+
+
+async def processing_get_events() -> bytes:
+    """Getting all events that are still active. (deadline has not passed)
+
+    Served from the event cache as a pre-serialized JSON body.
+    """
+    return event_cache.body()
+
+
+async def processing_stream_events() -> AsyncIterator[bytes]:
+    """Streaming the events open for betting and then their changes as Server-Sent Events"""
+
+    async def snapshot() -> bytes:
+        return event_cache.body()
+
+    return event_hub.stream(snapshot)
 
 
 async def processing_create_bet(bet_data: BetSchema) -> BetCreateMessage:
-    """Bet creating."""
+    """Bet creating.
+
+    Closed events are rejected from the event cache without a database round
+    trip; otherwise the bet is inserted with a single conditional statement.
+    """
+    if event_cache.get(bet_data.event_id) is None:
+        raise HTTPException(
+            status_code=400, detail="The event is not available for betting."
+        )
+    bet_data.status = "PENDING"
     async with Transaction():
-        event = await Event.get_event_by_id(bet_data.event_id)
-        event = TypeAdapter(list[EventSchema]).validate_python(event)
-        if not event or event[0].deadline < datetime.now():
+        coefficient = await Bet.create(bet_data)
+        if coefficient is None:
             raise HTTPException(
                 status_code=400, detail="The event is not available for betting."
             )
-        bet_data.status = "PENDING"
-        await Bet.create(bet_data)
-    return BetCreateMessage(
-        message="The bet has been successfully accepted.", **bet_data.dict()
-    )
+        result = BetCreateMessage(
+            message="The bet has been successfully accepted.",
+            coefficient=coefficient,
+            **bet_data.dict(),
+        )
+        await enqueue_bets(BET_ACCEPTED, [result])
+    outbox_relay.notify()
+    return result
+
 
+async def processing_create_bets(bets: List[BetSchema]) -> BetBatchResult:
+    """Bulk bet creating.
 
-async def processing_get_bets() -> List[BetSchema]:
-    """Getting all bets"""
+    All referenced events are checked with one query and the accepted bets
+    are inserted with multi-row statements in a single transaction.
+    """
+    if len(bets) > settings.BETS_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch may contain at most {settings.BETS_BATCH_MAX_SIZE} bets.",
+        )
+    results: list[BetBatchItemResult | None] = []
+    candidates = []
+    seen = set()
     async with Transaction():
-        bets = await Bet.get_bets()
-    return TypeAdapter(list[BetSchema]).validate_python(bets)
+        coefficients = await Event.get_coefficients_for_betting(
+            list({bet.event_id for bet in bets})
+        )
+        for bet in bets:
+            if bet.bet_id in seen:
+                detail = "Duplicate bet_id."
+            elif bet.event_id not in coefficients:
+                detail = "The event is not available for betting."
+            else:
+                detail = None
+                bet.status = "PENDING"
+                candidates.append(bet)
+            seen.add(bet.bet_id)
+            results.append(
+                BetBatchItemResult(bet_id=bet.bet_id, accepted=False, detail=detail)
+                if detail
+                else None
+            )
+        inserted = await Bet.create_many(candidates, coefficients)
+        await enqueue_bets(
+            BET_ACCEPTED,
+            [bet for bet in candidates if bet.bet_id in inserted],
+            coefficients,
+        )
+    outbox_relay.notify()
+
+    accepted = iter(candidates)
+    for index, result in enumerate(results):
+        if result is not None:
+            continue
+        bet = next(accepted)
+        if bet.bet_id in inserted:
+            results[index] = BetBatchItemResult(
+                bet_id=bet.bet_id,
+                accepted=True,
+                coefficient=coefficients[bet.event_id],
+            )
+        else:
+            results[index] = BetBatchItemResult(
+                bet_id=bet.bet_id, accepted=False, detail="The bet already exists."
+            )
+    return BetBatchResult(results=results)
+
+
+def encode_cursor(bet: Bet) -> str:
+    return base64.urlsafe_b64encode(
+        msgspec.json.encode((bet.created_at, bet.bet_id))
+    ).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        return msgspec.json.decode(
+            base64.urlsafe_b64decode(cursor), type=tuple[datetime, UUID]
+        )
+    except (ValueError, msgspec.DecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.") from None
+
+
+async def processing_get_bets(
+    filters: BetFilter, limit: int, cursor: str | None = None
+) -> BetsPage:
+    """Getting one page of bets in (created_at, bet_id) order."""
+    after = decode_cursor(cursor) if cursor else None
+    async with Transaction(read_only=True):
+        bets = await Bet.get_bets(filters, limit + 1, after)
+    next_cursor = encode_cursor(bets[limit - 1]) if len(bets) > limit else None
+    return BetsPage(
+        bets=TypeAdapter(list[BetRead]).validate_python(bets[:limit]),
+        next_cursor=next_cursor,
+    )
+
+
+async def processing_stream_bets(
+    filters: BetFilter, cursor: str | None = None
+) -> AsyncIterator[bytes]:
+    """Streaming bets as NDJSON lines straight from a server-side cursor."""
+    after = decode_cursor(cursor) if cursor else None
+    return stream_bets_ndjson(filters, after)
+
+
+async def stream_bets_ndjson(
+    filters: BetFilter, after: tuple[datetime, UUID] | None
+) -> AsyncIterator[bytes]:
+    encoder = msgspec.json.Encoder()
+    async with Transaction(read_only=True):
+        async for bet in Bet.stream_bets(filters, after):
+            yield encoder.encode(
+                {
+                    "bet_id": bet.bet_id,
+                    "event_id": bet.event_id,
+                    "status": bet.status,
+                    "amount": bet.amount,
+                    "created_at": bet.created_at,
+                    "coefficient": bet.coefficient,
+                }
+            ) + b"\n"
+
+
+async def processing_get_metrics() -> bytes:
+    """Getting metrics in the Prometheus text format"""
+    return render()
+
+
+async def processing_get_db_pool_stats() -> dict:
+    """Getting database connection pool and replica statistics"""
+    return {**pool_metrics.snapshot(), "replica": replica_router.snapshot()}
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from config import settings
+from logger import logger
+from metrics import SETTLED_BETS
+from models import Settlement
+from outbox import BET_SETTLED, enqueue_bets, outbox_relay
+from transactions import Transaction
+
+
+class SettlementEngine:
+    """Settles the bets of finished events in bounded, resumable chunks.
+
+    Jobs are rows of the ``settlements`` table written by the consumer. Each
+    chunk of up to ``chunk_size`` bets is locked with ``SKIP LOCKED``, settled
+    with its payout and committed together with the job progress and an
+    outbox message announcing the settled bets, so a crash
+    loses at most one chunk and the engine picks up where it stopped on the
+    next start.
+    """
+
+    def __init__(self, chunk_size: int, poll_interval: float):
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+
+    def notify(self) -> None:
+        """Wake the engine up after new settlement jobs were committed."""
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        logger.info("Settlement engine started.")
+        while True:
+            self._wakeup.clear()
+            try:
+                async with Transaction():
+                    jobs = await Settlement.get_unfinished()
+                for job in jobs:
+                    await self.settle(job)
+            except Exception as e:
+                logger.error(f"Settlement run failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def settle(self, job: Settlement) -> int:
+        """Settle every pending bet of one event; returns the number settled."""
+        started = time.perf_counter()
+        total = 0
+        while True:
+            async with Transaction():
+                settled = await Settlement.run_chunk(job, self.chunk_size)
+                await enqueue_bets(BET_SETTLED, settled)
+            outbox_relay.notify()
+            SETTLED_BETS.inc(len(settled))
+            total += len(settled)
+            if len(settled) < self.chunk_size:
+                break
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Settled {total} bets of event {job.event_id} as {job.status} in {elapsed:.3f}s ({total / elapsed if elapsed else 0:.0f} bets/s)."
+        )
+        return total
+
+
+settlement_engine = SettlementEngine(
+    settings.SETTLEMENT_CHUNK_SIZE, settings.SETTLEMENT_POLL_INTERVAL_S
+)
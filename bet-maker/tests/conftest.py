@@ -0,0 +1,44 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from cache import CachedEvent
+from codec import EventMessage
+
+
+@pytest.fixture
+def make_message():
+    """Factory of event updates, open and due in a day unless told otherwise."""
+
+    def make(
+        event_id: str,
+        version: int = 1,
+        deadline: datetime | None = None,
+        state: str = "NEW",
+    ) -> EventMessage:
+        return EventMessage(
+            event_id=event_id,
+            coefficient=Decimal("1.5"),
+            deadline=deadline or datetime.now() + timedelta(days=1),
+            state=state,
+            action="update",
+            version=version,
+        )
+
+    return make
+
+
+@pytest.fixture
+def make_cached_event():
+    """Factory of cached events."""
+
+    def make(event_id: str, deadline: datetime, state: str = "NEW") -> CachedEvent:
+        return CachedEvent(
+            event_id=event_id, coefficient=Decimal("1.5"), deadline=deadline, state=state
+        )
+
+    return make
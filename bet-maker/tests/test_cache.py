@@ -0,0 +1,50 @@
+import asyncio
+import os
+import sys
+
+import msgspec
+import pytest
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from cache import EventCache
+
+
+def test_closed_and_past_events_are_not_cached(make_cached_event):
+    """Test that only events open for betting are kept and served"""
+    cache = EventCache()
+    now = datetime.now()
+    cache.update(
+        [
+            make_cached_event("open", now + timedelta(hours=1)),
+            make_cached_event("past", now - timedelta(seconds=1)),
+            make_cached_event("closing", now + timedelta(hours=1)),
+        ]
+    )
+    cache.update([make_cached_event("closing", now + timedelta(hours=1), "CLOSED")])
+
+    assert cache.get("open") is not None
+    assert cache.get("past") is None
+    assert cache.get("closing") is None
+    assert [event["event_id"] for event in msgspec.json.decode(cache.body())] == [
+        "open"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_events_are_evicted_at_their_deadline(make_cached_event):
+    """Test that the timer drops an event once its deadline passes"""
+    cache = EventCache()
+    now = datetime.now()
+    cache.update(
+        [
+            make_cached_event("expiring", now + timedelta(milliseconds=50)),
+            make_cached_event("moved", now + timedelta(milliseconds=50)),
+            make_cached_event("open", now + timedelta(hours=1)),
+        ]
+    )
+    cache.update([make_cached_event("moved", now + timedelta(hours=2))])
+    assert len(cache.events) == 3
+    await asyncio.sleep(0.2)
+
+    assert set(cache.events) == {"moved", "open"}
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from codec import EventBatch, EventMessage, encode
+from consumer import EventConsumer
+
+
+class FakeMessage:
+    """What the consumer needs of an ``aio_pika.IncomingMessage``."""
+
+    def __init__(self, body: bytes, redelivered: bool = False):
+        self.body = body
+        self.content_type = "application/json"
+        self.message_id = "message1"
+        self.redelivered = redelivered
+        self.outcome = None
+
+    async def ack(self) -> None:
+        self.outcome = "ack"
+
+    async def nack(self, requeue: bool = True) -> None:
+        self.outcome = "nack"
+
+    async def reject(self, requeue: bool = False) -> None:
+        self.outcome = "reject"
+
+
+def make_consumer(on_events, lanes: int = 4) -> EventConsumer:
+    return EventConsumer(
+        on_events,
+        lanes=lanes,
+        batch_size=10,
+        batch_timeout_ms=20,
+        lane_capacity=10,
+        max_attempts=3,
+        retry_backoff_ms=5,
+    )
+
+
+async def consume(*batches: list[EventMessage], on_events, redelivered=False):
+    messages = [
+        FakeMessage(encode(EventBatch(events=events)), redelivered)
+        for events in batches
+    ]
+    consumer = make_consumer(on_events, lanes=1)
+    consumer.start()
+    for message in messages:
+        await consumer.on_message(message)
+    await asyncio.sleep(0.1)
+    await consumer.stop()
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_lanes_coalesce_updates_of_one_event(make_message):
+    """Test that each lane applies only the latest version of an event"""
+    batches = []
+
+    async def on_events(events):
+        batches.append([(event.event_id, event.version) for event in events])
+
+    events = [make_message("event1", version) for version in (1, 3, 2)]
+    (message,) = await consume(events, on_events=on_events)
+
+    assert batches == [[("event1", 3)]]
+    assert message.outcome == "ack"
+
+
+def test_events_are_spread_over_lanes_by_id():
+    """Test that an event always maps to the same lane and ids spread out"""
+    consumer = make_consumer(None)
+    lanes = {id(consumer.lane_for(f"event{i}")) for i in range(100)}
+
+    assert consumer.lane_for("event1") is consumer.lane_for("event1")
+    assert len(lanes) == 4
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_before_giving_up(make_message):
+    """Test that a batch failing on its first attempt is retried and acked"""
+    attempts = []
+
+    async def on_events(events):
+        attempts.append(len(events))
+        if len(attempts) == 1:
+            raise RuntimeError("serialization failure")
+
+    (message,) = await consume([make_message("event1")], on_events=on_events)
+
+    assert attempts == [1, 1]
+    assert message.outcome == "ack"
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_requeues_the_message_once(make_message):
+    """Test that a failing message is requeued, then rejected on redelivery"""
+    calls = []
+
+    async def on_events(events):
+        calls.append(len(events))
+        raise RuntimeError("database is down")
+
+    events = [make_message("event1"), make_message("event2")]
+    (first,) = await consume(events, on_events=on_events)
+    (redelivered,) = await consume(events, on_events=on_events, redelivered=True)
+
+    assert calls == [2, 2, 2, 1, 1] * 2
+    assert first.outcome == "nack"
+    assert redelivered.outcome == "reject"
+
+
+@pytest.mark.asyncio
+async def test_only_messages_with_a_poison_update_are_rejected(make_message):
+    """Test that after retries the batch is split so healthy messages are acked"""
+    applied = []
+
+    async def on_events(events):
+        if any(event.event_id == "poison" for event in events):
+            raise ValueError("numeric field overflow")
+        applied.extend(event.event_id for event in events)
+
+    healthy, poisoned = await consume(
+        [make_message("event1")],
+        [make_message("event2"), make_message("poison")],
+        on_events=on_events,
+        redelivered=True,
+    )
+
+    assert sorted(applied) == ["event1", "event2"]
+    assert healthy.outcome == "ack"
+    assert poisoned.outcome == "reject"
+
+
+@pytest.mark.asyncio
+async def test_undecodable_message_is_rejected():
+    """Test that a message that can not be decoded is rejected, not requeued"""
+    message = FakeMessage(b"not json")
+    await make_consumer(None, lanes=1).on_message(message)
+
+    assert message.outcome == "reject"
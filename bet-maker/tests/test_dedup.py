@@ -0,0 +1,53 @@
+import os
+import sys
+
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from dedup import HighWaterMarks
+
+
+def test_marks_are_dropped_for_finished_and_long_past_events(make_message):
+    """Test that finished events and events past deadline plus grace are evicted"""
+    marks = HighWaterMarks(timedelta(hours=1))
+    now = datetime.now()
+    marks.advance(
+        [
+            make_message("open", 1, now + timedelta(hours=1)),
+            make_message("finished", 1, now - timedelta(minutes=5)),
+            make_message("stale", 1, now - timedelta(hours=2)),
+            make_message("moved", 1, now - timedelta(hours=2)),
+        ]
+    )
+    marks.advance(
+        [
+            make_message("finished", 2, now - timedelta(minutes=5), "FINISHED_WIN"),
+            make_message("moved", 2, now + timedelta(hours=2)),
+        ]
+    )
+
+    assert marks.versions == {"open": 1, "moved": 2}
+    assert set(marks.deadlines) == {"open", "moved"}
+
+
+def test_filter_drops_duplicate_and_older_versions(make_message):
+    """Test that only updates newer than the applied version pass the filter"""
+    marks = HighWaterMarks(timedelta(hours=1))
+    deadline = datetime.now() + timedelta(hours=1)
+    marks.advance([make_message("event1", 2, deadline)])
+
+    fresh = marks.filter(
+        [
+            make_message("event1", 1, deadline),
+            make_message("event1", 2, deadline),
+            make_message("event1", 3, deadline),
+            make_message("event2", 1, deadline),
+        ]
+    )
+
+    assert [(event.event_id, event.version) for event in fresh] == [
+        ("event1", 3),
+        ("event2", 1),
+    ]
+    marks.advance(fresh)
+    assert marks.versions == {"event1": 3, "event2": 1}
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import outbox
+from outbox import OutboxRelay
+
+
+class StubOutbox:
+    """Outbox table whose deletes only take effect when the transaction commits."""
+
+    def __init__(self, size: int):
+        self.rows = [
+            SimpleNamespace(id=i, routing_key="bet.accepted", body=b"{}")
+            for i in range(1, size + 1)
+        ]
+        self.deleting: list[int] = []
+        self.log: list[str] = []
+
+    async def claim(self, limit: int) -> list[SimpleNamespace]:
+        return self.rows[:limit]
+
+    async def delete(self, ids: list[int]) -> None:
+        self.log.append(f"delete {ids}")
+        self.deleting = ids
+
+    def transaction(self) -> "StubTransaction":
+        return StubTransaction(self)
+
+
+class StubTransaction:
+    def __init__(self, table: StubOutbox):
+        self.table = table
+
+    async def __aenter__(self) -> None:
+        self.table.deleting = []
+
+    async def __aexit__(self, exception_type, exception, traceback) -> None:
+        if exception is None:
+            self.table.rows = [
+                row for row in self.table.rows if row.id not in self.table.deleting
+            ]
+
+
+class StubPublisher:
+    def __init__(self, table: StubOutbox, failures: int = 0):
+        self.table = table
+        self.failures = failures
+
+    async def send_message(self, body: bytes, routing_key: str, message_id: str):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("broker is down")
+        self.table.log.append(f"publish {message_id}")
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = StubOutbox(size=3)
+    monkeypatch.setattr(outbox, "Transaction", table.transaction)
+    monkeypatch.setattr(outbox.OutboxMessage, "claim", table.claim)
+    monkeypatch.setattr(outbox.OutboxMessage, "delete", table.delete)
+    return table
+
+
+@pytest.mark.asyncio
+async def test_messages_are_deleted_after_they_are_published(table):
+    """Test that a batch is published first and deleted in the same transaction"""
+    relay = OutboxRelay(StubPublisher(table), batch_size=2, poll_interval=1)
+
+    assert await relay.relay_batch() == 2
+    assert await relay.relay_batch() == 1
+    assert await relay.relay_batch() == 0
+
+    assert table.log == [
+        "publish 1",
+        "publish 2",
+        "delete [1, 2]",
+        "publish 3",
+        "delete [3]",
+    ]
+    assert table.rows == []
+
+
+@pytest.mark.asyncio
+async def test_failed_publish_keeps_messages_for_the_next_round(table):
+    """Test that messages stay in the outbox when publishing fails and are retried"""
+    relay = OutboxRelay(
+        StubPublisher(table, failures=1), batch_size=10, poll_interval=0.01
+    )
+
+    with pytest.raises(ConnectionError):
+        await relay.relay_batch()
+    assert [row.id for row in table.rows] == [1, 2, 3]
+
+    task = asyncio.create_task(relay.run())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert table.rows == []
+    assert [entry for entry in table.log if entry.startswith("delete")] == [
+        "delete [1, 2, 3]"
+    ]
+    assert table.log[-4:] == ["publish 1", "publish 2", "publish 3", "delete [1, 2, 3]"]
@@ -0,0 +1,85 @@
+import os
+import sys
+
+import punq
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import transactions
+from config import settings
+from db import PoolMetrics, container
+from transactions import Transaction
+
+
+class StubSession:
+    def __init__(self, maker: "StubSessionMaker"):
+        self.maker = maker
+
+    async def connection(self) -> None:
+        if self.maker.error:
+            raise self.maker.error
+
+    async def commit(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class StubSessionMaker:
+    """Session factory whose checkouts fail with ``error`` once it is set."""
+
+    def __init__(self):
+        self.error: Exception | None = None
+
+    def __call__(self) -> StubSession:
+        return StubSession(self)
+
+
+@pytest.fixture
+def primary(monkeypatch):
+    primary = StubSessionMaker()
+    stub = punq.Container()
+    stub.register(sessionmaker, instance=primary)
+    monkeypatch.setattr(transactions, "container", stub)
+    return primary
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = PoolMetrics(slow_acquire_ms=100)
+    monkeypatch.setattr(transactions, "pool_metrics", metrics)
+    return metrics
+
+
+def test_snapshot_reports_pool_and_wait_times():
+    """Test that wait times are aggregated into the pool snapshot"""
+    metrics = PoolMetrics(slow_acquire_ms=100)
+    metrics.observe_wait(0.01)
+    metrics.observe_wait(0.25)
+    snapshot = metrics.snapshot()
+
+    assert snapshot["size"] == settings.DB_POOL_SIZE
+    assert snapshot["checked_out"] == 0
+    assert snapshot["acquired"] == 2
+    assert snapshot["wait_time_total_s"] == 0.26
+    assert snapshot["wait_time_max_s"] == 0.25
+    assert container.resolve(sessionmaker) is container.resolve(sessionmaker)
+
+
+@pytest.mark.asyncio
+async def test_transaction_records_checkouts_and_timeouts(primary, metrics):
+    """Test that every checkout is counted and pool timeouts are reported"""
+    async with Transaction():
+        assert metrics.waiters == 0
+    primary.error = PoolTimeoutError("QueuePool limit reached")
+    with pytest.raises(PoolTimeoutError):
+        async with Transaction():
+            pass
+
+    assert metrics.acquired == 1
+    assert metrics.timeouts == 1
+    assert metrics.waiters == 0
+    assert transactions.db_session.get() is None
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from config import settings
+from models import Bet, Event
+from schemas import BetFilter
+
+
+async def _explain(sql: str) -> list:
+    engine = create_async_engine(settings.database_uri_async, poolclass=NullPool)
+    try:
+        async with engine.connect() as connection:
+            # Test tables are tiny, so a sequential scan would always win;
+            # disabling it checks that a matching index exists and is usable.
+            await connection.execute(text("SET enable_seqscan = off"))
+            result = await connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+            return result.scalar()
+    finally:
+        await engine.dispose()
+
+
+async def _root_indexes(names: set[str]) -> set[str]:
+    engine = create_async_engine(settings.database_uri_async, poolclass=NullPool)
+    try:
+        async with engine.connect() as connection:
+            result = await connection.execute(
+                text(
+                    "SELECT coalesce(pg_partition_root(name::regclass), name::regclass)::text"
+                    " FROM unnest(CAST(:names AS text[])) AS name"
+                ),
+                {"names": list(names)},
+            )
+            return set(result.scalars())
+    finally:
+        await engine.dispose()
+
+
+def explain(stmt) -> list:
+    sql = stmt.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    return asyncio.run(_explain(str(sql)))
+
+
+def _index_names(plan: dict) -> set[str]:
+    found = set()
+    if "Index Name" in plan:
+        found.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        found |= _index_names(child)
+    return found
+
+
+def index_scans(plan: dict) -> set[str]:
+    """Names of all indexes scanned anywhere in the plan tree.
+
+    Indexes of table partitions are reported as the partitioned index they
+    belong to.
+    """
+    return asyncio.run(_root_indexes(_index_names(plan)))
+
+
+@pytest.fixture(scope="module", autouse=True)
+def database():
+    try:
+        asyncio.run(_explain("SELECT 1"))
+    except (OSError, DBAPIError) as e:
+        pytest.skip(f"PostgreSQL is not available: {e}")
+
+
+def test_events_for_betting_use_partial_index():
+    """Test that listing open events scans the partial deadline index"""
+    plan = explain(Event.select_events_for_betting())
+    assert "ix_events_open_deadline" in index_scans(plan[0]["Plan"])
+
+
+def test_settlement_uses_event_status_index():
+    """Test that settling an event finds its pending bets through the index"""
+    plan = explain(Bet.settle_chunk("event1", "WON", 1000))
+    assert "ix_bets_event_id_status" in index_scans(plan[0]["Plan"])
+
+
+def test_bets_keyset_page_uses_created_at_index():
+    """Test that paginating bets walks the (created_at, bet_id) index"""
+    plan = explain(Bet.select_bets(BetFilter()).limit(100))
+    assert "ix_bets_created_at_bet_id" in index_scans(plan[0]["Plan"])
@@ -0,0 +1,136 @@
+import os
+import sys
+
+import punq
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import transactions
+from db import ReplicaRouter
+from transactions import Transaction, db_session
+
+
+class StubResult:
+    def __init__(self, value: float):
+        self.value = value
+
+    def scalar(self) -> float:
+        return self.value
+
+
+class StubSession:
+    """What the router and ``Transaction`` need of an ``AsyncSession``."""
+
+    def __init__(self, maker: "StubSessionMaker"):
+        self.maker = maker
+
+    async def __aenter__(self) -> "StubSession":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    async def execute(self, statement) -> StubResult:
+        if self.maker.error:
+            raise self.maker.error
+        return StubResult(self.maker.lag)
+
+    async def connection(self) -> None:
+        if self.maker.error:
+            raise self.maker.error
+
+    async def commit(self) -> None:
+        pass
+
+    async def rollback(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class StubSessionMaker:
+    """Session factory of an engine with a given replay lag or error."""
+
+    def __init__(self, lag: float = 0.0, error: Exception | None = None):
+        self.lag = lag
+        self.error = error
+        self.sessions: list[StubSession] = []
+
+    def __call__(self) -> StubSession:
+        session = StubSession(self)
+        self.sessions.append(session)
+        return session
+
+
+def route(monkeypatch, replica: StubSessionMaker, check_interval_s: float = 60):
+    """Point ``Transaction`` at a stub primary and a router over ``replica``."""
+    primary = StubSessionMaker()
+    container = punq.Container()
+    container.register(sessionmaker, instance=primary)
+    router = ReplicaRouter(replica, max_lag_s=5, check_interval_s=check_interval_s)
+    monkeypatch.setattr(transactions, "container", container)
+    monkeypatch.setattr(transactions, "replica_router", router)
+    return primary, router
+
+
+async def session_of(read_only: bool):
+    async with Transaction(read_only=read_only):
+        return db_session.get()
+
+
+@pytest.mark.asyncio
+async def test_lagging_replica_is_skipped_until_it_catches_up():
+    """Test that reads go to the primary while replica lag exceeds the threshold"""
+    replica = StubSessionMaker(lag=12.5)
+    router = ReplicaRouter(replica, max_lag_s=5, check_interval_s=0)
+
+    assert await router.choose() is None
+    assert router.snapshot() == {"configured": True, "healthy": False, "lag_s": 12.5}
+
+    replica.lag = 0.5
+    assert await router.choose() is replica
+    assert router.healthy
+
+
+@pytest.mark.asyncio
+async def test_unreachable_replica_falls_back_to_primary():
+    """Test that a replica failing its lag check is not chosen"""
+    router = ReplicaRouter(
+        StubSessionMaker(error=OSError("connection refused")),
+        max_lag_s=5,
+        check_interval_s=0,
+    )
+
+    assert await router.choose() is None
+    assert router.snapshot() == {"configured": True, "healthy": False, "lag_s": None}
+    assert await ReplicaRouter(None, 5, 0).choose() is None
+
+
+@pytest.mark.asyncio
+async def test_replica_connection_failure_marks_it_failed(monkeypatch):
+    """Test that a read whose replica connection fails is served by the primary"""
+    replica = StubSessionMaker()
+    primary, router = route(monkeypatch, replica)
+    assert await router.choose() is replica
+
+    replica.error = OSError("connection reset")
+    session = await session_of(read_only=True)
+
+    assert session in primary.sessions
+    assert not router.healthy
+    assert await router.choose() is None
+
+
+@pytest.mark.asyncio
+async def test_only_read_only_transactions_use_the_replica(monkeypatch):
+    """Test that writes always go to the primary, reads to a healthy replica"""
+    replica = StubSessionMaker()
+    primary, _ = route(monkeypatch, replica)
+
+    write = await session_of(read_only=False)
+    read = await session_of(read_only=True)
+
+    assert primary.sessions == [write]
+    assert read in replica.sessions and read not in primary.sessions
@@ -0,0 +1,20 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from schemas import BetFilter
+
+
+def test_bet_filter_makes_aware_bounds_naive():
+    """Test that aware created_from/created_to become naive at the same instant"""
+    moment = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+    filters = BetFilter(
+        created_from=moment,
+        created_to=moment.astimezone(timezone(timedelta(hours=3))),
+    )
+
+    assert filters.created_from.tzinfo is None
+    assert filters.created_from == filters.created_to
+    assert filters.created_from == moment.astimezone().replace(tzinfo=None)
+    assert BetFilter(created_to=datetime(2024, 5, 1)).created_to == datetime(2024, 5, 1)
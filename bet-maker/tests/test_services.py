@@ -0,0 +1,138 @@
+import os
+import sys
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from fastapi import HTTPException
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import services
+from schemas import Bet, BetFilter
+from services import decode_cursor, processing_create_bets, processing_get_bets
+
+
+class NullTransaction:
+    async def __aenter__(self) -> None:
+        pass
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    """Stand in for the database: only event1 is open, bet_id 0 is taken."""
+    taken = uuid.UUID(int=0)
+    enqueued = []
+
+    async def get_coefficients_for_betting(event_ids):
+        return {"event1": Decimal("1.5")} if "event1" in event_ids else {}
+
+    async def create_many(bets, coefficients):
+        return {bet.bet_id for bet in bets if bet.bet_id != taken}
+
+    async def enqueue_bets(kind, bets, coefficients):
+        enqueued.extend(bet.bet_id for bet in bets)
+
+    monkeypatch.setattr(services, "Transaction", NullTransaction)
+    monkeypatch.setattr(
+        services.Event, "get_coefficients_for_betting", get_coefficients_for_betting
+    )
+    monkeypatch.setattr(services.Bet, "create_many", create_many)
+    monkeypatch.setattr(services, "enqueue_bets", enqueue_bets)
+    return enqueued
+
+
+def make_bet(bet_id: int, event_id: str = "event1") -> Bet:
+    return Bet(
+        bet_id=uuid.UUID(int=bet_id),
+        event_id=event_id,
+        status="PENDING",
+        amount=Decimal("10.00"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_results_follow_request_order(enqueued):
+    """Test that every bet gets its own result, in the order it was sent"""
+    bets = [make_bet(3), make_bet(1, "closed"), make_bet(2), make_bet(3), make_bet(0)]
+
+    result = await processing_create_bets(bets)
+
+    assert [
+        (item.bet_id.int, item.accepted, item.coefficient, item.detail)
+        for item in result.results
+    ] == [
+        (3, True, Decimal("1.5"), None),
+        (1, False, None, "The event is not available for betting."),
+        (2, True, Decimal("1.5"), None),
+        (3, False, None, "Duplicate bet_id."),
+        (0, False, None, "The bet already exists."),
+    ]
+    assert enqueued == [uuid.UUID(int=3), uuid.UUID(int=2)]
+
+
+@pytest.mark.asyncio
+async def test_oversize_batch_is_rejected(enqueued, monkeypatch):
+    """Test that a batch over the size limit is refused with 413 before any work"""
+    monkeypatch.setattr(services.settings, "BETS_BATCH_MAX_SIZE", 2)
+
+    with pytest.raises(HTTPException) as error:
+        await processing_create_bets([make_bet(1), make_bet(2), make_bet(3)])
+
+    assert error.value.status_code == 413
+    assert enqueued == []
+
+
+@pytest.mark.asyncio
+async def test_cursor_continues_where_the_page_ended(monkeypatch):
+    """Test that following next_cursor visits every bet once, ties broken by id"""
+    created_at = datetime(2026, 1, 1)
+    stored = sorted(
+        (
+            SimpleNamespace(
+                bet_id=uuid.UUID(int=i),
+                event_id="event1",
+                status="PENDING",
+                amount=Decimal("10.00"),
+                created_at=created_at + timedelta(seconds=i // 3),
+                coefficient=Decimal("1.5"),
+            )
+            for i in range(7)
+        ),
+        key=lambda bet: (bet.created_at, bet.bet_id),
+    )
+
+    async def get_bets(filters, limit, after=None):
+        return [
+            bet
+            for bet in stored
+            if after is None or (bet.created_at, bet.bet_id) > after
+        ][:limit]
+
+    monkeypatch.setattr(services, "Transaction", lambda read_only: NullTransaction())
+    monkeypatch.setattr(services.Bet, "get_bets", get_bets)
+
+    pages, cursor = [], None
+    while True:
+        page = await processing_get_bets(BetFilter(), limit=2, cursor=cursor)
+        pages.append([bet.bet_id.int for bet in page.bets])
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert pages == [[0, 1], [2, 3], [4, 5], [6]]
+    assert decode_cursor(
+        (await processing_get_bets(BetFilter(), limit=2)).next_cursor
+    ) == (created_at, uuid.UUID(int=1))
+
+
+def test_malformed_cursor_is_rejected():
+    """Test that a cursor that does not decode is refused with 400"""
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor")
+
+    assert error.value.status_code == 400
@@ -1,6 +1,9 @@
+import time
 from contextvars import ContextVar
 
-from db import container
+from db import container, pool_metrics, replica_router
+from metrics import DB_POOL_TIMEOUTS, TRANSACTION_DURATION
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 
@@ -9,10 +12,51 @@ db_session: ContextVar[AsyncSession | None] = ContextVar("db_session", default=N
 
 
 class Transaction:
+    """Session scope that commits on success and rolls back on error.
+
+    ``read_only`` transactions are served by the replica when one is
+    configured and within the allowed lag, and by the primary otherwise.
+    """
+
+    def __init__(self, read_only: bool = False):
+        self.read_only = read_only
+
     async def __aenter__(self) -> None:
-        session_maker = container.resolve(sessionmaker)
+        self.started = time.perf_counter()
+        replica_session_maker = (
+            await replica_router.choose() if self.read_only else None
+        )
+        if replica_session_maker is not None:
+            try:
+                await self._open(replica_session_maker)
+                return
+            except (OSError, DBAPIError, PoolTimeoutError) as e:
+                replica_router.mark_failed(e)
+        await self._open(container.resolve(sessionmaker))
+
+    async def _open(self, session_maker: sessionmaker) -> None:
         self.session: AsyncSession = session_maker()
         self.token = db_session.set(self.session)
+        try:
+            await self._acquire_connection()
+        except BaseException:
+            await self.session.close()
+            db_session.reset(self.token)
+            raise
+
+    async def _acquire_connection(self) -> None:
+        """Check out the connection up front so pool waits are measured."""
+        pool_metrics.waiters += 1
+        started = time.perf_counter()
+        try:
+            await self.session.connection()
+        except PoolTimeoutError:
+            pool_metrics.timeouts += 1
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            pool_metrics.waiters -= 1
+        pool_metrics.observe_wait(time.perf_counter() - started)
 
     async def __aexit__(self, exception_type, exception, traceback) -> None:
         if exception:
@@ -21,3 +65,6 @@ class Transaction:
             await self.session.commit()
         await self.session.close()
         db_session.reset(self.token)
+        TRANSACTION_DURATION.labels(
+            str(self.read_only).lower(), "rollback" if exception else "commit"
+        ).observe(time.perf_counter() - self.started)
@@ -2,12 +2,18 @@ from datetime import datetime
 from decimal import Decimal
 from typing import List
 
-from fastapi import APIRouter
-from schemas import Event, Message
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from schemas import Event, EventState, Message
 from services import (
     processing_create_event,
+    processing_create_events_bulk,
     processing_get_event,
     processing_get_events,
+    processing_get_metrics,
+    processing_stream_events,
+    processing_get_readiness,
     processing_update_coefficient,
     processing_update_status,
     processing_update_deadline,
@@ -23,6 +29,16 @@ async def create_event(event: Event) -> Message:
     return result
 
 
+@router.post("/events/bulk")
+async def create_events_bulk(request: Request) -> List[Message]:
+    """Creating events from a JSON array or an NDJSON stream."""
+    body = await request.body()
+    result = await processing_create_events_bulk(
+        body, request.headers.get("content-type", "application/json")
+    )
+    return result
+
+
 @router.get("/event/{event_id}")
 async def get_event(event_id: str = None) -> Event:
     """Getting event by event_id"""
@@ -37,22 +53,53 @@ async def get_events() -> List[Event]:
     return result
 
 
+@router.get("/events/stream")
+async def stream_events() -> StreamingResponse:
+    """Streaming active events and then their changes as Server-Sent Events"""
+    result = await processing_stream_events()
+    return StreamingResponse(
+        result,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/ready")
+async def get_readiness() -> dict:
+    """Checking that events are loaded and RabbitMQ is connected"""
+    result = await processing_get_readiness()
+    return result
+
+
+@router.get("/metrics")
+async def get_metrics() -> Response:
+    """Getting metrics in the Prometheus text format"""
+    result = await processing_get_metrics()
+    return Response(content=result, media_type=CONTENT_TYPE_LATEST)
+
+
 @router.put("/update_coefficient")
-async def update_coefficient(event_id: str, new_coefficient: Decimal) -> Message:
+async def update_coefficient(
+    event_id: str, new_coefficient: Decimal, expected_version: int | None = None
+) -> Message:
     """Changing the coefficient for an event."""
-    result = await processing_update_coefficient(event_id, new_coefficient)
+    result = await processing_update_coefficient(event_id, new_coefficient, expected_version)
     return result
 
 
 @router.put("/update_status")
-async def update_status(event_id: str, new_status: str) -> Message:
+async def update_status(
+    event_id: str, new_status: EventState, expected_version: int | None = None
+) -> Message:
     """Changing the status for an event."""
-    result = await processing_update_status(event_id, new_status)
+    result = await processing_update_status(event_id, new_status, expected_version)
     return result
 
 
 @router.put("/update_deadline")
-async def update_deadline(event_id: str, new_deadline: datetime) -> Message:
+async def update_deadline(
+    event_id: str, new_deadline: datetime, expected_version: int | None = None
+) -> Message:
     """Changing the deadline for an event."""
-    result = await processing_update_deadline(event_id, new_deadline)
+    result = await processing_update_deadline(event_id, new_deadline, expected_version)
     return result
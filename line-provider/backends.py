@@ -0,0 +1,554 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Protocol
+
+import msgspec
+
+from config import settings
+from eventlog import EventLog
+from logger import logger
+from schemas import Event
+from store import (
+    EventExists,
+    EventNotFound,
+    EventRecord,
+    EventStore,
+    VersionConflict,
+    apply_changes,
+    next_version,
+)
+
+
+class EventBackend(Protocol):
+    """Where line-provider keeps its events.
+
+    ``create``, ``update`` and ``get`` return the event with its version;
+    ``update`` with ``expected_version`` is a compare-and-set, and
+    ``create_many`` creates all of its events or none of them. They raise
+    ``EventExists``, ``EventNotFound`` and ``VersionConflict`` from store.py.
+    """
+
+    is_ready: bool
+
+    async def start(self) -> None: ...
+
+    async def stop(self) -> None: ...
+
+    async def create(self, event: Event) -> tuple[Event, int]: ...
+
+    async def create_many(self, events: list[Event]) -> list[tuple[Event, int]]: ...
+
+    async def update(
+        self,
+        event_id: str,
+        changes: dict[str, Any],
+        expected_version: int | None = None,
+    ) -> tuple[Event, int]: ...
+
+    async def get(self, event_id: str) -> tuple[Event, int]: ...
+
+    async def active(self) -> list[Event]: ...
+
+    async def open_deadlines(self) -> list[tuple[float, str]]: ...
+
+
+class MemoryBackend:
+    """Single-process backend: an ``EventStore`` persisted by an ``EventLog``."""
+
+    def __init__(self, store: EventStore, log: EventLog):
+        self.store = store
+        self.log = log
+
+    @property
+    def is_ready(self) -> bool:
+        return self.log.is_open
+
+    async def start(self) -> None:
+        self.store.load(*self.log.replay())
+        await self.log.start(self.store.records)
+
+    async def stop(self) -> None:
+        await self.log.stop()
+
+    async def create(self, event: Event) -> tuple[Event, int]:
+        event, version = self.store.create(event)
+        self.log.append(event, version)
+        return event, version
+
+    async def create_many(self, events: list[Event]) -> list[tuple[Event, int]]:
+        created = self.store.create_many(events)
+        for event, version in created:
+            self.log.append(event, version)
+        return created
+
+    async def update(
+        self,
+        event_id: str,
+        changes: dict[str, Any],
+        expected_version: int | None = None,
+    ) -> tuple[Event, int]:
+        event, version = self.store.update(event_id, changes, expected_version)
+        self.log.append(event, version)
+        return event, version
+
+    async def get(self, event_id: str) -> tuple[Event, int]:
+        return self.store.get(event_id), self.store.get_version(event_id)
+
+    async def active(self) -> list[Event]:
+        return self.store.active()
+
+    async def open_deadlines(self) -> list[tuple[float, str]]:
+        return await asyncio.to_thread(self.store.open_deadlines)
+
+
+class SQLiteBackend:
+    """Backend shared by every process on a host through one SQLite file.
+
+    Also the local stand-in for a SQL database in tests. Writes take the
+    database lock with ``BEGIN IMMEDIATE``, so a read-modify-write of an
+    event is atomic across processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.connection is not None
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self._connect)
+
+    def _connect(self) -> None:
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(
+            self.path, timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " event_id TEXT PRIMARY KEY,"
+            " coefficient TEXT NOT NULL,"
+            " deadline TEXT NOT NULL,"
+            " deadline_ts REAL NOT NULL,"
+            " state TEXT NOT NULL,"
+            " version INTEGER NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_events_deadline_ts ON events (deadline_ts)"
+        )
+        self.connection = connection
+
+    async def stop(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    async def _run(self, function, *args):
+        return await asyncio.to_thread(self._locked, function, *args)
+
+    def _locked(self, function, *args):
+        with self._lock:
+            return function(*args)
+
+    def _select(self, event_id: str) -> EventRecord | None:
+        row = self.connection.execute(
+            "SELECT event_id, coefficient, deadline, deadline_ts, state, version"
+            " FROM events WHERE event_id = ?",
+            (event_id,),
+        ).fetchone()
+        return EventRecord(*row) if row else None
+
+    def _write(self, record: EventRecord) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO events"
+            " (event_id, coefficient, deadline, deadline_ts, state, version)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                record.event_id,
+                record.coefficient,
+                record.deadline,
+                record.deadline_ts,
+                record.state,
+                record.version,
+            ),
+        )
+
+    async def create(self, event: Event) -> tuple[Event, int]:
+        return await self._run(self._create, event)
+
+    def _create(self, event: Event) -> tuple[Event, int]:
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            if self._select(event.event_id) is not None:
+                raise EventExists(event.event_id)
+            version = next_version(0)
+            self._write(EventRecord.from_event(event, version))
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        return event, version
+
+    async def create_many(self, events: list[Event]) -> list[tuple[Event, int]]:
+        return await self._run(self._create_many, events)
+
+    def _create_many(self, events: list[Event]) -> list[tuple[Event, int]]:
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            for event in events:
+                if self._select(event.event_id) is not None:
+                    raise EventExists(event.event_id)
+            created = [(event, next_version(0)) for event in events]
+            self.connection.executemany(
+                "INSERT INTO events"
+                " (event_id, coefficient, deadline, deadline_ts, state, version)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    msgspec.structs.astuple(EventRecord.from_event(event, version))
+                    for event, version in created
+                ),
+            )
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        return created
+
+    async def update(
+        self,
+        event_id: str,
+        changes: dict[str, Any],
+        expected_version: int | None = None,
+    ) -> tuple[Event, int]:
+        return await self._run(self._update, event_id, changes, expected_version)
+
+    def _update(
+        self, event_id: str, changes: dict[str, Any], expected_version: int | None
+    ) -> tuple[Event, int]:
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            current = self._select(event_id)
+            if current is None:
+                raise EventNotFound(event_id)
+            if expected_version is not None and expected_version != current.version:
+                raise VersionConflict(event_id, expected_version, current.version)
+            event = apply_changes(current.to_event(), changes)
+            version = next_version(current.version)
+            self._write(EventRecord.from_event(event, version))
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        return event, version
+
+    async def get(self, event_id: str) -> tuple[Event, int]:
+        record = await self._run(self._select, event_id)
+        if record is None:
+            raise EventNotFound(event_id)
+        return record.to_event(), record.version
+
+    async def active(self) -> list[Event]:
+        rows = await self._run(self._select_active)
+        return [EventRecord(*row).to_event() for row in rows]
+
+    async def open_deadlines(self) -> list[tuple[float, str]]:
+        rows = await self._run(self._select_open_deadlines)
+        return [(deadline_ts, event_id) for deadline_ts, event_id in rows]
+
+    def _select_open_deadlines(self) -> list[tuple]:
+        return self.connection.execute(
+            "SELECT deadline_ts, event_id FROM events WHERE state = 'NEW'"
+        ).fetchall()
+
+    def _select_active(self) -> list[tuple]:
+        return self.connection.execute(
+            "SELECT event_id, coefficient, deadline, deadline_ts, state, version"
+            " FROM events WHERE deadline_ts > ? ORDER BY deadline_ts",
+            (time.time(),),
+        ).fetchall()
+
+
+class RedisBackend:
+    """Backend shared across hosts through a Redis-compatible server.
+
+    Every event is a hash at ``event:{event_id}`` holding an ``EventRecord``;
+    active events are indexed by deadline in the ``events:deadlines`` sorted
+    set. Read-modify-writes use ``WATCH``/``MULTI`` and retry on contention.
+    Needs the optional ``redis`` package.
+    """
+
+    DEADLINES = "events:deadlines"
+    FIELDS = ("event_id", "coefficient", "deadline", "deadline_ts", "state", "version")
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError(
+                "EVENT_BACKEND=redis needs the 'redis' package to be installed."
+            ) from None
+        self._redis_module = redis
+        self.url = url
+        self.client = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.client is not None
+
+    async def start(self) -> None:
+        client = self._redis_module.from_url(self.url)
+        await client.ping()
+        self.client = client
+
+    async def stop(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    @staticmethod
+    def _key(event_id: str) -> str:
+        return f"event:{event_id}"
+
+    def _decode(self, values: dict) -> EventRecord:
+        fields = {key.decode(): value.decode() for key, value in values.items()}
+        return EventRecord(
+            event_id=fields["event_id"],
+            coefficient=fields["coefficient"],
+            deadline=fields["deadline"],
+            deadline_ts=float(fields["deadline_ts"]),
+            state=fields["state"],
+            version=int(fields["version"]),
+        )
+
+    def _encode(self, record: EventRecord) -> dict:
+        return {field: str(getattr(record, field)) for field in self.FIELDS}
+
+    async def _write(
+        self,
+        event_id: str,
+        build: Callable[[EventRecord | None], EventRecord],
+    ) -> EventRecord:
+        key = self._key(event_id)
+        watch_error = self._redis_module.WatchError
+        while True:
+            async with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(key)
+                    values = await pipe.hgetall(key)
+                    record = build(self._decode(values) if values else None)
+                    pipe.multi()
+                    pipe.hset(key, mapping=self._encode(record))
+                    pipe.zadd(self.DEADLINES, {event_id: record.deadline_ts})
+                    await pipe.execute()
+                    return record
+                except watch_error:
+                    continue
+
+    async def create(self, event: Event) -> tuple[Event, int]:
+        def build(current: EventRecord | None) -> EventRecord:
+            if current is not None:
+                raise EventExists(event.event_id)
+            return EventRecord.from_event(event, next_version(0))
+
+        record = await self._write(event.event_id, build)
+        return event, record.version
+
+    async def create_many(self, events: list[Event]) -> list[tuple[Event, int]]:
+        keys = [self._key(event.event_id) for event in events]
+        watch_error = self._redis_module.WatchError
+        while True:
+            async with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(*keys)
+                    for event, key in zip(events, keys):
+                        if await pipe.exists(key):
+                            raise EventExists(event.event_id)
+                    created = [(event, next_version(0)) for event in events]
+                    pipe.multi()
+                    deadlines = {}
+                    for (event, version), key in zip(created, keys):
+                        record = EventRecord.from_event(event, version)
+                        pipe.hset(key, mapping=self._encode(record))
+                        deadlines[event.event_id] = record.deadline_ts
+                    pipe.zadd(self.DEADLINES, deadlines)
+                    await pipe.execute()
+                    return created
+                except watch_error:
+                    continue
+
+    async def update(
+        self,
+        event_id: str,
+        changes: dict[str, Any],
+        expected_version: int | None = None,
+    ) -> tuple[Event, int]:
+        updated: list[Event] = []
+
+        def build(current: EventRecord | None) -> EventRecord:
+            if current is None:
+                raise EventNotFound(event_id)
+            if expected_version is not None and expected_version != current.version:
+                raise VersionConflict(event_id, expected_version, current.version)
+            event = apply_changes(current.to_event(), changes)
+            updated[:] = [event]
+            return EventRecord.from_event(event, next_version(current.version))
+
+        record = await self._write(event_id, build)
+        return updated[0], record.version
+
+    async def get(self, event_id: str) -> tuple[Event, int]:
+        values = await self.client.hgetall(self._key(event_id))
+        if not values:
+            raise EventNotFound(event_id)
+        record = self._decode(values)
+        return record.to_event(), record.version
+
+    async def active(self) -> list[Event]:
+        event_ids = await self.client.zrangebyscore(
+            self.DEADLINES, f"({time.time()}", "+inf"
+        )
+        if not event_ids:
+            return []
+        async with self.client.pipeline(transaction=False) as pipe:
+            for event_id in event_ids:
+                pipe.hgetall(self._key(event_id.decode()))
+            rows = await pipe.execute()
+        return [self._decode(values).to_event() for values in rows if values]
+
+    async def open_deadlines(self) -> list[tuple[float, str]]:
+        entries = await self.client.zrange(self.DEADLINES, 0, -1, withscores=True)
+        if not entries:
+            return []
+        async with self.client.pipeline(transaction=False) as pipe:
+            for event_id, _ in entries:
+                pipe.hget(self._key(event_id.decode()), "state")
+            states = await pipe.execute()
+        return [
+            (deadline_ts, event_id.decode())
+            for (event_id, deadline_ts), state in zip(entries, states)
+            if state == b"NEW"
+        ]
+
+
+class CachedBackend:
+    """Read-through cache of single events in front of a shared backend.
+
+    Writes made through this process refresh the cache; writes made by
+    other processes reach it as event messages on the fanout exchange and
+    evict older cached versions through ``invalidate``. The newest version
+    seen per event is remembered, so a read racing an invalidation can not
+    put a stale event back. Listings always go to the backend.
+    """
+
+    def __init__(self, backend: EventBackend, max_size: int):
+        self.backend = backend
+        self.max_size = max_size
+        self.cache: OrderedDict[str, tuple[Event, int]] = OrderedDict()
+        self.latest: OrderedDict[str, int] = OrderedDict()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.backend.is_ready
+
+    async def start(self) -> None:
+        await self.backend.start()
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    def _seen(self, event_id: str, version: int) -> bool:
+        """Record ``version``; returns False if a newer one was seen before."""
+        if self.latest.get(event_id, 0) > version:
+            return False
+        self.latest[event_id] = version
+        self.latest.move_to_end(event_id)
+        while len(self.latest) > self.max_size:
+            self.latest.popitem(last=False)
+        return True
+
+    def _remember(self, event: Event, version: int) -> None:
+        if not self._seen(event.event_id, version):
+            return
+        self.cache[event.event_id] = (event, version)
+        self.cache.move_to_end(event.event_id)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+
+    def invalidate(self, event_id: str, version: int) -> None:
+        """Drop the cached event if it is older than ``version``."""
+        self._seen(event_id, version)
+        cached = self.cache.get(event_id)
+        if cached is not None and cached[1] < version:
+            del self.cache[event_id]
+
+    async def create(self, event: Event) -> tuple[Event, int]:
+        event, version = await self.backend.create(event)
+        self._remember(event, version)
+        return event, version
+
+    async def create_many(self, events: list[Event]) -> list[tuple[Event, int]]:
+        created = await self.backend.create_many(events)
+        for event, version in created:
+            self._remember(event, version)
+        return created
+
+    async def update(
+        self,
+        event_id: str,
+        changes: dict[str, Any],
+        expected_version: int | None = None,
+    ) -> tuple[Event, int]:
+        try:
+            event, version = await self.backend.update(
+                event_id, changes, expected_version
+            )
+        except VersionConflict as e:
+            self.invalidate(event_id, e.actual)
+            raise
+        self._remember(event, version)
+        return event, version
+
+    async def get(self, event_id: str) -> tuple[Event, int]:
+        cached = self.cache.get(event_id)
+        if cached is not None:
+            self.cache.move_to_end(event_id)
+            return cached
+        event, version = await self.backend.get(event_id)
+        self._remember(event, version)
+        return event, version
+
+    async def active(self) -> list[Event]:
+        return await self.backend.active()
+
+    async def open_deadlines(self) -> list[tuple[float, str]]:
+        return await self.backend.open_deadlines()
+
+
+def make_backend() -> EventBackend:
+    """Build the backend selected by ``EVENT_BACKEND``."""
+    if settings.EVENT_BACKEND == "memory":
+        return MemoryBackend(
+            EventStore(settings.EVENT_STORE_SHARDS),
+            EventLog(
+                settings.EVENT_LOG_DIR,
+                settings.EVENT_LOG_FSYNC_INTERVAL_MS,
+                settings.EVENT_LOG_COMPACT_BYTES,
+            ),
+        )
+    if settings.EVENT_BACKEND == "sqlite":
+        backend = SQLiteBackend(settings.EVENT_SQLITE_PATH)
+    elif settings.EVENT_BACKEND == "redis":
+        backend = RedisBackend(settings.REDIS_URL)
+    else:
+        raise ValueError(f"Unknown event backend: {settings.EVENT_BACKEND}")
+    logger.info(f"Using the {settings.EVENT_BACKEND} event backend with a local cache.")
+    return CachedBackend(backend, settings.EVENT_CACHE_SIZE)
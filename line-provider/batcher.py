@@ -0,0 +1,94 @@
+import asyncio
+import time
+import uuid
+
+from codec import EventBatch, EventMessage, encode
+from metrics import AMQP_PUBLISH_DURATION, AMQP_PUBLISH_FAILURES, AMQP_PUBLISHED_EVENTS
+from rabbitmq import RabbitMQ
+from logger import logger
+
+
+class EventUpdateBuffer:
+    """Outbound buffer that coalesces event updates before publishing.
+
+    Pending messages are kept per ``event_id`` with last-write-wins on
+    ``version``, and flushed as one ``EventBatch`` every ``window_ms``
+    milliseconds or as soon as ``max_batch_size`` distinct events are pending.
+    """
+
+    def __init__(
+        self,
+        publisher: RabbitMQ,
+        window_ms: int,
+        max_batch_size: int,
+        content_type: str,
+    ):
+        self.publisher = publisher
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.content_type = content_type
+        self.pending: dict[str, EventMessage] = {}
+        self._batch_full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def add(self, message: EventMessage) -> None:
+        """Queue a message, replacing an older pending one for the same event."""
+        current = self.pending.get(message.event_id)
+        if current is None or current.version < message.version:
+            self.pending[message.event_id] = message
+        if len(self.pending) >= self.max_batch_size:
+            self._batch_full.set()
+
+    async def start(self) -> None:
+        """Start the background flush loop."""
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Event update buffer started with a {self.window}s window and batches of up to {self.max_batch_size} events."
+        )
+
+    async def stop(self) -> None:
+        """Stop the flush loop and publish whatever is still pending."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_full.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Publish all pending messages in batches of at most ``max_batch_size``.
+
+        Nothing is sent until the publisher is connected; updates keep
+        coalescing in the meantime.
+        """
+        if not self.pending or not self.publisher.is_connected:
+            return
+        messages, self.pending = list(self.pending.values()), {}
+        for start in range(0, len(messages), self.max_batch_size):
+            batch = messages[start : start + self.max_batch_size]
+            started = time.perf_counter()
+            try:
+                await self.publisher.send_message(
+                    encode(EventBatch(events=batch), self.content_type),
+                    self.content_type,
+                    str(uuid.uuid4()),
+                )
+            except Exception as e:
+                AMQP_PUBLISH_FAILURES.inc()
+                logger.error("Failed to flush {} event updates: {}", len(batch), e)
+                for message in batch:
+                    self.add(message)
+            else:
+                AMQP_PUBLISH_DURATION.observe(time.perf_counter() - started)
+                AMQP_PUBLISHED_EVENTS.inc(len(batch))
@@ -0,0 +1,64 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Literal
+from uuid import UUID
+
+import msgspec
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+class EventMessage(msgspec.Struct):
+    """One event snapshot.
+
+    ``version`` is the per-event sequence number: it grows with every change
+    of the event, so consumers keep the highest one applied and drop the
+    rest. ``message_id`` identifies this particular update.
+    """
+
+    event_id: str
+    coefficient: Decimal
+    deadline: datetime
+    state: Literal["NEW", "CLOSED", "FINISHED_WIN", "FINISHED_LOSE"]
+    action: str
+    version: int
+    message_id: UUID | None = None
+
+
+class EventBatch(msgspec.Struct, tag=1, tag_field="schema_version"):
+    """Wire format of the events exchange, version 1.
+
+    ``schema_version`` is written on encode and checked on decode, so a
+    consumer rejects payloads of a format it does not understand.
+    """
+
+    events: list[EventMessage]
+
+
+_encoders = {
+    JSON_CONTENT_TYPE: msgspec.json.Encoder(),
+    MSGPACK_CONTENT_TYPE: msgspec.msgpack.Encoder(),
+}
+_decoders = {
+    JSON_CONTENT_TYPE: msgspec.json.Decoder(EventBatch),
+    MSGPACK_CONTENT_TYPE: msgspec.msgpack.Decoder(EventBatch),
+}
+
+
+def encode(batch: EventBatch, content_type: str = JSON_CONTENT_TYPE) -> bytes:
+    """Encode a batch in the format named by ``content_type``."""
+    try:
+        encoder = _encoders[content_type]
+    except KeyError:
+        raise ValueError(f"Unsupported content type: {content_type}") from None
+    return encoder.encode(batch)
+
+
+def decode(body: bytes, content_type: str | None = None) -> EventBatch:
+    """Decode a batch, falling back to JSON when no content type is set."""
+    try:
+        decoder = _decoders[content_type or JSON_CONTENT_TYPE]
+    except KeyError:
+        raise ValueError(f"Unsupported content type: {content_type}") from None
+    return decoder.decode(body)
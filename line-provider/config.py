@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -5,11 +7,36 @@ class Settings(BaseSettings):
     APP_HOST: str = "0.0.0.0"
     APP_PORT: int = 8000
 
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_RATE_LIMIT_PER_S: float = 20.0
+    LOG_RATE_LIMIT_BURST: int = 100
+    LOG_SAMPLING: dict[str, float] = {}
+
+    EVENT_BACKEND: Literal["memory", "sqlite", "redis"] = "memory"
+    EVENT_STORE_SHARDS: int = 16
+    EVENT_SQLITE_PATH: str = "data/events.sqlite3"
+    EVENT_CACHE_SIZE: int = 100000
+    REDIS_URL: str = "redis://redis:6379/0"
+    EVENT_LOG_DIR: str = "data"
+    EVENT_LOG_FSYNC_INTERVAL_MS: int = 10
+    EVENT_LOG_COMPACT_BYTES: int = 64 * 1024 * 1024
+    EVENT_BULK_MAX_SIZE: int = 10000
+    SCHEDULER_RESYNC_S: float = 30.0
+
+    STREAM_MAX_PENDING: int = 1000
+    STREAM_KEEPALIVE_S: float = 15.0
+
     RABBITMQ_HOST: str = "rabbitmq:5672"
     RABBITMQ_USER: str = "rabbitmq"
     RABBITMQ_PASSWORD: str = "rabbitmq"
     RABBITMQ_QUEUE_NAME: str = "events"
     RABBITMQ_EXCHANGE_NAME: str = "events"
+    RABBITMQ_CHANNEL_POOL_SIZE: int = 8
+    RABBITMQ_BATCH_WINDOW_MS: int = 50
+    RABBITMQ_BATCH_MAX_SIZE: int = 500
+    RABBITMQ_CONTENT_TYPE: str = "application/json"
+    RABBITMQ_CONNECT_RETRY_MAX_S: float = 30.0
 
     @property
     def rabbitmq_url(self) -> str:
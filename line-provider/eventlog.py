@@ -0,0 +1,197 @@
+import asyncio
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Callable, Iterator
+
+import msgspec
+from logger import logger
+from schemas import Event
+from store import EventRecord
+
+FRAME_HEADER = struct.Struct("<I")
+SNAPSHOT_FRAME_SIZE = 10000
+
+
+def read_frames(path: Path) -> tuple[list[EventRecord], int]:
+    """Decode every complete frame of a file through a read-only mmap.
+
+    Returns the records and the length of the intact prefix of the file; a
+    frame cut short by a crash ends the read.
+    """
+    decoder = msgspec.msgpack.Decoder(list[EventRecord])
+    records: list[EventRecord] = []
+    if not path.exists() or path.stat().st_size == 0:
+        return records, 0
+    with open(path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped:
+        view = memoryview(mapped)
+        size, offset = len(mapped), 0
+        try:
+            while offset + FRAME_HEADER.size <= size:
+                (length,) = FRAME_HEADER.unpack_from(mapped, offset)
+                end = offset + FRAME_HEADER.size + length
+                if end > size:
+                    break
+                try:
+                    records.extend(decoder.decode(view[offset + FRAME_HEADER.size : end]))
+                except msgspec.DecodeError:
+                    break
+                offset = end
+        finally:
+            view.release()
+    return records, offset
+
+
+def frame(records: list[EventRecord], encoder: msgspec.msgpack.Encoder) -> bytes:
+    payload = encoder.encode(records)
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def fsync_directory(directory: Path) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class EventLog:
+    """Append-only log of event changes with a snapshot, on local disk.
+
+    Every change is appended as an ``EventRecord`` with the full new state of
+    the event, so replay is last-write-wins per ``event_id``. Appends are buffered in memory and
+    written with a single ``fsync`` every ``fsync_interval_ms``, so a crash
+    loses at most that window. Once the log outgrows ``compact_bytes``, the
+    live events are written to a fresh snapshot and the log is truncated.
+
+    Files are a sequence of frames, each a little-endian ``uint32`` length
+    followed by a msgpack array of records.
+    """
+
+    def __init__(self, directory: str, fsync_interval_ms: int, compact_bytes: int):
+        self.directory = Path(directory)
+        self.snapshot_path = self.directory / "events.snapshot"
+        self.log_path = self.directory / "events.log"
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.compact_bytes = compact_bytes
+        self.pending: list[EventRecord] = []
+        self.log_size = 0
+        self._encoder = msgspec.msgpack.Encoder()
+        self._file = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._live_records: Callable[[], list[EventRecord]] = list
+
+    @property
+    def is_open(self) -> bool:
+        return self._file is not None
+
+    def replay(self) -> tuple[list[EventRecord], list[EventRecord]]:
+        """Read the snapshot records and the log records, oldest first.
+
+        A torn tail left by a crash is cut off the log before appending resumes.
+        """
+        started = time.perf_counter()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        snapshot, _ = read_frames(self.snapshot_path)
+        log, intact = read_frames(self.log_path)
+        if self.log_path.exists() and intact < self.log_path.stat().st_size:
+            logger.warning(f"Truncating torn tail of {self.log_path} at {intact} bytes.")
+            os.truncate(self.log_path, intact)
+        self.log_size = intact
+        self._file = open(self.log_path, "ab")
+        logger.info(
+            f"Read {len(snapshot)} snapshot and {len(log)} log records in {time.perf_counter() - started:.3f}s."
+        )
+        return snapshot, log
+
+    def append(self, event: Event, version: int) -> None:
+        """Queue a change for the next batched write."""
+        self.pending.append(EventRecord.from_event(event, version))
+
+    async def start(self, live_records: Callable[[], list[EventRecord]]) -> None:
+        """Start the background flush loop; ``live_records`` feeds compaction."""
+        self._live_records = live_records
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write whatever is still pending."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            try:
+                await self.flush()
+                if self.log_size > self.compact_bytes:
+                    await self.compact()
+            except Exception as e:
+                logger.error(f"Failed to write the event log: {e}")
+
+    async def flush(self) -> None:
+        """Append all pending records as one frame and fsync the log."""
+        async with self._lock:
+            if not self.pending or self._file is None:
+                return
+            records, self.pending = self.pending, []
+            data = frame(records, self._encoder)
+            try:
+                await asyncio.to_thread(self._write, data)
+            except Exception:
+                self.pending[:0] = records
+                raise
+            self.log_size += len(data)
+
+    def _write(self, data: bytes) -> None:
+        try:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except Exception:
+            # Drop a partially written frame so later frames stay readable.
+            self._file.truncate(self.log_size)
+            raise
+
+    async def compact(self) -> None:
+        """Replace the snapshot with the live events and empty the log."""
+        async with self._lock:
+            started = time.perf_counter()
+            count = await asyncio.to_thread(self._write_snapshot)
+            self.log_size = 0
+            logger.info(
+                f"Compacted the event log into a snapshot of {count} events in {time.perf_counter() - started:.3f}s."
+            )
+
+    def _write_snapshot(self) -> int:
+        # Records come in deadline order, so the index sorts quickly on replay.
+        records = self._live_records()
+        temporary = self.snapshot_path.with_suffix(".tmp")
+        with open(temporary, "wb") as file:
+            for chunk in self._chunks(records):
+                file.write(frame(chunk, self._encoder))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.snapshot_path)
+        fsync_directory(self.directory)
+        self._file.truncate(0)
+        os.fsync(self._file.fileno())
+        return len(records)
+
+    @staticmethod
+    def _chunks(records: list[EventRecord]) -> Iterator[list[EventRecord]]:
+        for start in range(0, len(records), SNAPSHOT_FRAME_SIZE):
+            yield records[start : start + SNAPSHOT_FRAME_SIZE]
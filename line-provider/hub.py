@@ -0,0 +1,93 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Iterable
+
+import msgspec
+from codec import EventMessage
+from logger import logger
+
+KEEPALIVE = b": keepalive\n\n"
+
+
+def sse_frame(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+class Subscriber:
+    """Frames not yet written to one client, the latest one per event."""
+
+    def __init__(self):
+        self.pending: dict[str, bytes] = {}
+        self.wakeup = asyncio.Event()
+        self.dropped = False
+
+
+class EventHub:
+    """Fans event updates out to Server-Sent Events clients.
+
+    Each update is encoded into an SSE frame once and handed to every
+    subscriber by reference. A subscriber keeps only the latest frame per
+    event, so a client that reads slowly gets fewer, newer updates instead of
+    a growing backlog. One that falls more than ``max_pending`` events behind
+    is disconnected and gets a fresh snapshot when it reconnects.
+    """
+
+    def __init__(self, max_pending: int, keepalive_s: float):
+        self.subscribers: set[Subscriber] = set()
+        self.max_pending = max_pending
+        self.keepalive = keepalive_s
+        self.dropped = 0
+        self._encoder = msgspec.json.Encoder()
+
+    def publish(self, events: Iterable[EventMessage]) -> None:
+        """Queue updates for every subscriber."""
+        if not self.subscribers:
+            return
+        frames = {
+            event.event_id: sse_frame("update", self._encoder.encode(event))
+            for event in events
+        }
+        for subscriber in list(self.subscribers):
+            subscriber.pending.update(frames)
+            if len(subscriber.pending) > self.max_pending:
+                self._drop(subscriber)
+            else:
+                subscriber.wakeup.set()
+
+    def _drop(self, subscriber: Subscriber) -> None:
+        subscriber.dropped = True
+        subscriber.pending = {}
+        subscriber.wakeup.set()
+        self.subscribers.discard(subscriber)
+        self.dropped += 1
+        logger.warning(
+            f"Dropped a stream subscriber more than {self.max_pending} events behind."
+        )
+
+    async def stream(
+        self, snapshot: Callable[[], Awaitable[bytes]]
+    ) -> AsyncIterator[bytes]:
+        """SSE body: a snapshot of the events, then their updates.
+
+        The subscription starts before the snapshot is taken, so no update
+        falls between the two; clients keep the highest ``version`` per event.
+        """
+        subscriber = Subscriber()
+        self.subscribers.add(subscriber)
+        try:
+            yield sse_frame("snapshot", await snapshot())
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                subscriber.wakeup.clear()
+                if subscriber.dropped:
+                    return
+                frames, subscriber.pending = subscriber.pending, {}
+                yield b"".join(frames.values())
+        finally:
+            self.subscribers.discard(subscriber)
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self.subscribers), "dropped": self.dropped}
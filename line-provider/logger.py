@@ -1,10 +1,83 @@
+import random
 import sys
+import threading
+import time
+import traceback
 
+import msgspec
 from loguru import logger
 
+from config import settings
 
+TEXT_FORMAT = "{time:YYYY.MM.DD HH:mm:ss} | {level} | {file}:{function}:{line} | {message}"
+
+_encoder = msgspec.json.Encoder(enc_hook=str)
+
+
+class LogLimiter:
+    """Loguru filter that samples and rate-limits records per call site.
+
+    ``sampling`` maps ``"module:function"`` to the fraction of its records to
+    keep. Every call site may then log ``per_second`` records a second, with
+    bursts of up to ``burst``; the rest are dropped, and the next record let
+    through carries the number dropped in ``extra["suppressed"]``.
+    """
+
+    def __init__(self, per_second: float, burst: int, sampling: dict[str, float]):
+        self.per_second = per_second
+        self.burst = burst
+        self.sampling = sampling
+        self._buckets: dict[tuple[str, int], tuple[float, float, int]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, record: dict) -> bool:
+        rate = self.sampling.get(f"{record['name']}:{record['function']}")
+        if rate is not None and random.random() >= rate:
+            return False
+        key = (record["name"], record["line"])
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.per_second)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[key] = (tokens - 1, now, 0)
+        if suppressed:
+            record["extra"]["suppressed"] = suppressed
+        return True
+
+
+def json_format(record: dict) -> str:
+    """One JSON object per line; serialized here, written by the sink thread."""
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    extra = {key: value for key, value in record["extra"].items() if key != "json"}
+    if extra:
+        entry["extra"] = extra
+    if record["exception"] is not None:
+        entry["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    record["extra"]["json"] = _encoder.encode(entry).decode()
+    return "{extra[json]}\n"
+
+
+# Replaces loguru's default stderr sink. With enqueue=True the write happens on
+# a background thread, so a slow stdout never blocks the event loop.
+logger.remove()
 logger.add(
     sys.stdout,
-    format="{time:YYYY.MM.DD HH:mm:ss} | {level} | {file}:{function}:{line} | {message}",
-    level="INFO",
+    format=json_format if settings.LOG_JSON else TEXT_FORMAT,
+    level=settings.LOG_LEVEL,
+    filter=LogLimiter(
+        settings.LOG_RATE_LIMIT_PER_S,
+        settings.LOG_RATE_LIMIT_BURST,
+        settings.LOG_SAMPLING,
+    ),
+    enqueue=True,
 )
@@ -1,31 +1,64 @@
 import asyncio
+from contextlib import asynccontextmanager
 
+from aio_pika import IncomingMessage
 from fastapi import FastAPI
 from api import router as api_router
+from backends import CachedBackend
+from codec import decode
 from config import settings
-from rabbitmq import RabbitMQ
+from services import deadline_scheduler, event_backend, publisher, update_buffer
 from logger import logger
+from metrics import MetricsMiddleware
 
-app = FastAPI()
 
-app.include_router(api_router)
-
-
-@app.on_event("startup")
-async def startup():
-    """Creating exchange and queue on startup."""
+async def invalidate_cached_events(message: IncomingMessage) -> None:
+    """Evict events changed by any line-provider instance from the local cache."""
     try:
-        await asyncio.sleep(10)
-        async with RabbitMQ(
-            settings.rabbitmq_url,
-            settings.RABBITMQ_QUEUE_NAME,
-            settings.RABBITMQ_EXCHANGE_NAME,
-        ) as rabbitmq:
-            await rabbitmq.connect()
-            await rabbitmq.create_exchange_and_queue()
-            logger.info(
-                f"RabbitMQ setup complete with exchange '{settings.RABBITMQ_EXCHANGE_NAME}' and queue '{settings.RABBITMQ_QUEUE_NAME}'."
-            )
+        batch = decode(message.body, message.content_type)
     except Exception as e:
-        logger.error(f"Failed to set up RabbitMQ: {e}")
-        raise
+        logger.error("Dropping undecodable message {}: {}", message.message_id, e)
+        return
+    for event in batch.events:
+        event_backend.invalidate(event.event_id, event.version)
+
+
+async def connect_publisher() -> None:
+    """Connect to RabbitMQ, retrying with exponential backoff until it is up."""
+    delay = 0.5
+    while True:
+        try:
+            await publisher.connect()
+            break
+        except Exception:
+            logger.warning(f"RabbitMQ is not reachable yet, retrying in {delay}s.")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.RABBITMQ_CONNECT_RETRY_MAX_S)
+    if isinstance(event_backend, CachedBackend):
+        await publisher.subscribe(invalidate_cached_events)
+    logger.info(
+        f"RabbitMQ setup complete with exchange '{settings.RABBITMQ_EXCHANGE_NAME}' and queue '{settings.RABBITMQ_QUEUE_NAME}'."
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Loading the event backend and scheduling open events to close at their
+    deadlines, then connecting the RabbitMQ publisher in the background.
+    ``GET /ready`` reports when both are done."""
+    await event_backend.start()
+    await update_buffer.start()
+    await deadline_scheduler.start()
+    connecting = asyncio.create_task(connect_publisher())
+    yield
+    connecting.cancel()
+    await deadline_scheduler.stop()
+    await update_buffer.stop()
+    await event_backend.stop()
+    await publisher.close()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+app.include_router(api_router)
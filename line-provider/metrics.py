@@ -0,0 +1,92 @@
+import time
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Own registry, so both services can be loaded into one process.
+registry = CollectorRegistry()
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status.",
+    ["method", "route", "status"],
+    registry=registry,
+)
+AMQP_PUBLISH_DURATION = Histogram(
+    "amqp_publish_duration_seconds",
+    "Time to publish one batch of event updates until the broker confirms it.",
+    registry=registry,
+)
+AMQP_PUBLISHED_EVENTS = Counter(
+    "amqp_published_events",
+    "Event updates published to RabbitMQ.",
+    registry=registry,
+)
+AMQP_PUBLISH_FAILURES = Counter(
+    "amqp_publish_failures",
+    "Batches of event updates that failed to publish.",
+    registry=registry,
+)
+AMQP_PENDING_UPDATES = Gauge(
+    "amqp_pending_updates",
+    "Event updates waiting in the buffer for the next batch.",
+    registry=registry,
+)
+EVENT_STORE_SIZE = Gauge(
+    "event_store_events",
+    "Events held by the event store.",
+    registry=registry,
+)
+EVENTS_CLOSED = Counter(
+    "events_closed",
+    "Events closed at their deadline.",
+    registry=registry,
+)
+STREAM_SUBSCRIBERS = Gauge(
+    "stream_subscribers",
+    "Clients connected to the event stream.",
+    registry=registry,
+)
+
+
+class MetricsMiddleware:
+    """Observes the latency of every HTTP request per route template.
+
+    A plain ASGI middleware, so it adds one histogram observation per request
+    and nothing else to the request path.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                scope["method"], route.path if route else "unmatched", str(status)
+            ).observe(time.perf_counter() - started)
+
+
+def render() -> bytes:
+    """All metrics in the Prometheus text format."""
+    return generate_latest(registry)
@@ -1,47 +1,63 @@
-from typing import Any, Callable
+from typing import Awaitable, Callable
+
 import aio_pika
-from aio_pika import ExchangeType, Message, IncomingMessage
+from aio_pika import ExchangeType, IncomingMessage, Message
+from aio_pika.abc import AbstractChannel
+from aio_pika.pool import Pool
+from codec import JSON_CONTENT_TYPE
 from logger import logger
 
 
 class RabbitMQ:
-    def __init__(self, host: str, queue_name: str, exchange_name: str):
+    """Long-lived RabbitMQ publisher.
+
+    The connection, the exchange/queue declarations and a pool of channels with
+    publisher confirms are set up once in ``connect``; every ``send_message``
+    call only borrows a channel from the pool and publishes.
+    """
+
+    def __init__(
+        self, host: str, queue_name: str, exchange_name: str, pool_size: int = 8
+    ):
         self.host = host
         self.queue_name = queue_name
         self.exchange_name = exchange_name
+        self.pool_size = pool_size
         self.connection = None
-        self.channel = None
-        self.queue = None
-        self.exchange = None
+        self.channel_pool: Pool[AbstractChannel] | None = None
         logger.info(
             f"RabbitMQ instance created with host={self.host}, queue_name={self.queue_name}, exchange_name={self.exchange_name}"
         )
 
+    @property
+    def is_connected(self) -> bool:
+        return self.channel_pool is not None and not self.channel_pool.is_closed
+
     async def connect(self):
-        """Establish a connection and create a queue and exchange."""
+        """Establish a connection, declare the topology and create a channel pool."""
         try:
             self.connection = await aio_pika.connect_robust(self.host)
-            self.channel = await self.connection.channel()
-
-            self.exchange = await self.channel.declare_exchange(
-                self.exchange_name, ExchangeType.FANOUT, durable=True
+            await self.create_exchange_and_queue()
+            self.channel_pool = Pool(self._create_channel, max_size=self.pool_size)
+            logger.info(
+                f"Connected to RabbitMQ with a pool of {self.pool_size} channels."
             )
-            self.queue = await self.channel.declare_queue(self.queue_name, durable=True)
-            await self.queue.bind(self.exchange)
-
-            logger.info("Connected to RabbitMQ and set up exchange and queue bindings.")
         except Exception as e:
             logger.error(f"Failed to connect to RabbitMQ: {e}")
             raise
 
+    async def _create_channel(self) -> AbstractChannel:
+        return await self.connection.channel(publisher_confirms=True)
+
     async def create_exchange_and_queue(self):
         """Creating exchange and queue."""
         try:
-            self.exchange = await self.channel.declare_exchange(
-                self.exchange_name, ExchangeType.FANOUT, durable=True
-            )
-            self.queue = await self.channel.declare_queue(self.queue_name, durable=True)
-            await self.queue.bind(self.exchange)
+            async with self.connection.channel() as channel:
+                exchange = await channel.declare_exchange(
+                    self.exchange_name, ExchangeType.FANOUT, durable=True
+                )
+                queue = await channel.declare_queue(self.queue_name, durable=True)
+                await queue.bind(exchange)
             logger.info(
                 f"Created exchange '{self.exchange_name}' and queue '{self.queue_name}', and bound them together."
             )
@@ -49,23 +65,50 @@ class RabbitMQ:
             logger.error(f"Failed to create exchange and queue: {e}")
             raise
 
-    async def send_message(self, message: str):
-        """Sending message to exchange."""
-        if not self.channel or not self.exchange:
+    async def subscribe(
+        self, on_message: Callable[[IncomingMessage], Awaitable[None]]
+    ) -> None:
+        """Receive every message published to the exchange, by any instance.
+
+        Uses an exclusive, server-named queue that goes away with the connection.
+        """
+        channel = await self.connection.channel()
+        exchange = await channel.get_exchange(self.exchange_name, ensure=False)
+        queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+        await queue.bind(exchange)
+        await queue.consume(on_message, no_ack=True)
+        logger.info(f"Subscribed to exchange '{self.exchange_name}'.")
+
+    async def send_message(
+        self,
+        body: bytes,
+        content_type: str = JSON_CONTENT_TYPE,
+        message_id: str | None = None,
+    ):
+        """Sending message to exchange and waiting for the broker confirm."""
+        if not self.is_connected:
             logger.error("Attempted to send message without an active connection.")
             raise ConnectionError("No connection established. Call 'connect' first.")
 
         try:
-            await self.exchange.publish(
-                Message(body=message.encode()), routing_key=self.queue_name
-            )
-            logger.info(f"Message sent to exchange: {message}")
+            async with self.channel_pool.acquire() as channel:
+                exchange = await channel.get_exchange(self.exchange_name, ensure=False)
+                await exchange.publish(
+                    Message(
+                        body=body, content_type=content_type, message_id=message_id
+                    ),
+                    routing_key=self.queue_name,
+                )
+            logger.debug("Message of {} bytes sent to exchange.", len(body))
         except Exception as e:
             logger.error(f"Failed to send message: {e}")
             raise
 
     async def close(self):
-        """Closing connection."""
+        """Closing channel pool and connection."""
+        if self.channel_pool:
+            await self.channel_pool.close()
+            self.channel_pool = None
         if self.connection:
             try:
                 await self.connection.close()
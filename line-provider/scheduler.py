@@ -0,0 +1,145 @@
+import asyncio
+import heapq
+import time
+from typing import Awaitable, Callable
+
+from logger import logger
+from schemas import Event
+from store import deadline_key
+
+
+class DeadlineScheduler:
+    """Closes events for betting as their deadlines pass.
+
+    Deadlines of ``NEW`` events are kept in a heap of ``(deadline, event_id)``
+    and a single task sleeps until the earliest one. Every event that is due
+    by then is handed to ``close`` in one call, so thousands of simultaneous
+    kick-offs become one batch. ``_scheduled_at`` holds the one deadline
+    tracked per event, so updates that keep the deadline push nothing; heap
+    entries it no longer matches are dropped when they surface, and the heap
+    is rebuilt once they make up half of it. ``close`` still re-checks each
+    event, as it may have changed in the backend since.
+
+    The heap is seeded from ``load``, which lists every ``NEW`` event of the
+    backend, so events that fell due while the service was down close on the
+    first tick. Loading happens in the task, off the startup path. With
+    ``resync_s`` the heap is rebuilt from ``load`` that often, to pick up
+    events created by other workers on a shared backend.
+    """
+
+    def __init__(
+        self,
+        close: Callable[[list[str]], Awaitable[None]],
+        load: Callable[[], Awaitable[list[tuple[float, str]]]],
+        resync_s: float | None = None,
+        retry_s: float = 1.0,
+    ):
+        self.close = close
+        self.load = load
+        self.resync = resync_s
+        self.retry = retry_s
+        self._deadlines: list[tuple[float, str]] = []
+        self._scheduled_at: dict[str, float] = {}
+        # Entries scheduled before the first load completes or while a reload
+        # runs, which the load may have missed.
+        self._scheduled: list[tuple[float, str]] | None = []
+        self._resync_at = 0.0
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def schedule(self, event: Event) -> None:
+        """Track the deadline of an event while it is open for betting."""
+        if event.state != "NEW":
+            self._scheduled_at.pop(event.event_id, None)
+            return
+        key = deadline_key(event.deadline)
+        if self._scheduled_at.get(event.event_id) == key:
+            return
+        if self._scheduled is not None:
+            self._scheduled.append((key, event.event_id))
+        self._push(key, event.event_id)
+
+    def _push(self, key: float, event_id: str) -> None:
+        self._scheduled_at[event_id] = key
+        heapq.heappush(self._deadlines, (key, event_id))
+        if len(self._deadlines) > 2 * len(self._scheduled_at) + 64:
+            self._deadlines = [
+                (at, event_id) for event_id, at in self._scheduled_at.items()
+            ]
+            heapq.heapify(self._deadlines)
+        if self._deadlines[0] == (key, event_id):
+            self._changed.set()
+
+    def _is_current(self, entry: tuple[float, str]) -> bool:
+        return self._scheduled_at.get(entry[1]) == entry[0]
+
+    async def start(self) -> None:
+        """Start the timer task, which first loads the open events."""
+        self._task = asyncio.create_task(self._run())
+        logger.info("Deadline scheduler started.")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _reload(self) -> None:
+        if self._scheduled is None:
+            self._scheduled = []
+        try:
+            scheduled_at = {event_id: key for key, event_id in await self.load()}
+            scheduled_at.update(
+                (event_id, key) for key, event_id in self._scheduled
+            )
+        finally:
+            self._scheduled = None
+        self._scheduled_at = scheduled_at
+        self._deadlines = [(key, event_id) for event_id, key in scheduled_at.items()]
+        heapq.heapify(self._deadlines)
+        self._resync_at = (
+            float("inf") if self.resync is None else time.time() + self.resync
+        )
+
+    async def _run(self) -> None:
+        while True:
+            self._changed.clear()
+            now = time.time()
+            if now >= self._resync_at:
+                try:
+                    await self._reload()
+                except Exception as e:
+                    logger.error("Failed to load event deadlines: {}", e)
+                    self._resync_at = now + (self.resync or self.retry)
+                continue
+            if self._deadlines and self._deadlines[0][0] <= now:
+                await self._close_due(now)
+                continue
+            wake_at = min(
+                self._deadlines[0][0] if self._deadlines else float("inf"),
+                self._resync_at,
+            )
+            timeout = None if wake_at == float("inf") else wake_at - now
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _close_due(self, now: float) -> None:
+        due = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            entry = heapq.heappop(self._deadlines)
+            if self._is_current(entry):
+                del self._scheduled_at[entry[1]]
+                due.append(entry)
+        if not due:
+            return
+        try:
+            await self.close([event_id for _, event_id in due])
+        except Exception as e:
+            logger.error("Failed to close {} events, retrying: {}", len(due), e)
+            for _, event_id in due:
+                self._push(now + self.retry, event_id)
@@ -5,12 +5,16 @@ from typing import Literal
 from pydantic import BaseModel, Field
 
 
+EventState = Literal["NEW", "CLOSED", "FINISHED_WIN", "FINISHED_LOSE"]
+
+
 class Event(BaseModel):
     event_id: str
     coefficient: Decimal = Field(..., gt=0, max_digits=10, decimal_places=2)
     deadline: datetime
-    state: Literal["NEW", "FINISHED_WIN", "FINISHED_LOSE"]
+    state: EventState
 
 
 class Message(Event):
     action: str
+    version: int
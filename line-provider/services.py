@@ -1,96 +1,296 @@
+import json
+import time
+import uuid
 from datetime import datetime
 from decimal import Decimal
-from typing import List
-from schemas import Event, Message
+from typing import Any, AsyncIterator, List
+import msgspec
+from pydantic import TypeAdapter, ValidationError
+from schemas import Event, EventState, Message
 from fastapi import HTTPException
+from store import EventExists, EventNotFound, VersionConflict, deadline_key
+from backends import MemoryBackend, make_backend
 from rabbitmq import RabbitMQ
+from batcher import EventUpdateBuffer
+from hub import EventHub
+from metrics import (
+    AMQP_PENDING_UPDATES,
+    EVENT_STORE_SIZE,
+    EVENTS_CLOSED,
+    STREAM_SUBSCRIBERS,
+    render,
+)
+from scheduler import DeadlineScheduler
+from codec import EventMessage
 from config import settings
-from loguru import logger
+from logger import logger
 
-events: dict[str, Event] = {}
+publisher = RabbitMQ(
+    settings.rabbitmq_url,
+    settings.RABBITMQ_QUEUE_NAME,
+    settings.RABBITMQ_EXCHANGE_NAME,
+    settings.RABBITMQ_CHANNEL_POOL_SIZE,
+)
+event_backend = make_backend()
+update_buffer = EventUpdateBuffer(
+    publisher,
+    settings.RABBITMQ_BATCH_WINDOW_MS,
+    settings.RABBITMQ_BATCH_MAX_SIZE,
+    settings.RABBITMQ_CONTENT_TYPE,
+)
+event_hub = EventHub(settings.STREAM_MAX_PENDING, settings.STREAM_KEEPALIVE_S)
+event_list_adapter = TypeAdapter(List[Event])
+raw_list_decoder = msgspec.json.Decoder(List[msgspec.Raw])
+AMQP_PENDING_UPDATES.set_function(lambda: len(update_buffer.pending))
+STREAM_SUBSCRIBERS.set_function(lambda: len(event_hub.subscribers))
+if isinstance(event_backend, MemoryBackend):
+    EVENT_STORE_SIZE.set_function(lambda: len(event_backend.store))
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson")
 
 
-async def send_event_to_rabbitmq(event: Event, action: str) -> Message:
-    """Send a message with an event to RabbitMQ and return a message model."""
-    logger.info(f"Sending event {event.event_id} with action '{action}' to RabbitMQ.")
-    async with RabbitMQ(
-        settings.rabbitmq_url,
-        settings.RABBITMQ_QUEUE_NAME,
-        settings.RABBITMQ_EXCHANGE_NAME,
-    ) as rabbitmq:
-        message = Message(action=action, **event.dict())
-        await rabbitmq.send_message(message.json())
-        logger.info(f"Message sent for event {event.event_id}.")
-        return message
+async def send_event_to_rabbitmq(event: Event, action: str, version: int) -> Message:
+    """Queue a message with an event for RabbitMQ and return a message model."""
+    logger.debug("Sending event {} with action '{}' to RabbitMQ.", event.event_id, action)
+    message = Message(action=action, version=version, **event.dict())
+    event_message = EventMessage(message_id=uuid.uuid4(), **message.model_dump())
+    update_buffer.add(event_message)
+    event_hub.publish([event_message])
+    logger.debug("Message queued for event {}.", event.event_id)
+    return message
+
+
+def queue_event_messages(
+    changes: list[tuple[Event, int]], action: str
+) -> List[Message]:
+    """Queue messages for many changed events at once; they are published
+    together in the next batch."""
+    messages, event_messages = [], []
+    for event, version in changes:
+        message = Message(action=action, version=version, **event.model_dump())
+        event_message = EventMessage(message_id=uuid.uuid4(), **message.model_dump())
+        update_buffer.add(event_message)
+        messages.append(message)
+        event_messages.append(event_message)
+    event_hub.publish(event_messages)
+    return messages
+
+
+async def close_expired_events(event_ids: list[str]) -> None:
+    """Closing betting on events whose deadline has passed.
+
+    Events that were settled, moved to a later deadline or changed meanwhile
+    are skipped; every change reschedules the event anyway.
+    """
+    now = time.time()
+    closed = []
+    for event_id in dict.fromkeys(event_ids):
+        try:
+            event, version = await event_backend.get(event_id)
+            if event.state != "NEW" or deadline_key(event.deadline) > now:
+                continue
+            closed.append(
+                await event_backend.update(event_id, {"state": "CLOSED"}, version)
+            )
+        except (EventNotFound, VersionConflict):
+            continue
+    if closed:
+        EVENTS_CLOSED.inc(len(closed))
+        queue_event_messages(closed, "close")
+        logger.info("Closed {} events whose deadline has passed.", len(closed))
+
+
+deadline_scheduler = DeadlineScheduler(
+    close_expired_events,
+    event_backend.open_deadlines,
+    None if isinstance(event_backend, MemoryBackend) else settings.SCHEDULER_RESYNC_S,
+)
 
 
 async def processing_create_event(event: Event) -> Message:
     """Event creating."""
-    logger.info(f"Processing create event: {event.event_id}.")
-    if event.event_id not in events:
-        events[event.event_id] = event
-        logger.info(f"Event {event.event_id} created.")
-        return await send_event_to_rabbitmq(event, "create")
-    else:
-        logger.error(f"Event {event.event_id} already exists.")
+    logger.debug("Processing create event: {}.", event.event_id)
+    try:
+        event, version = await event_backend.create(event)
+    except EventExists:
+        logger.error("Event {} already exists.", event.event_id)
         raise HTTPException(
             status_code=400, detail=f"Event {event.event_id} already exists."
         )
+    logger.info("Event {} created.", event.event_id)
+    deadline_scheduler.schedule(event)
+    return await send_event_to_rabbitmq(event, "create", version)
+
+
+def check_bulk_size(count: int) -> None:
+    if count > settings.EVENT_BULK_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.EVENT_BULK_MAX_SIZE} events can be created at once.",
+        )
+
+
+def parse_events(body: bytes, content_type: str) -> List[Event]:
+    """Validate a JSON array or NDJSON body of events in one pass.
+
+    Events are counted before any of them is validated, so an oversized body
+    is refused without paying for its validation. Every invalid event is
+    reported at once; NDJSON errors are located by line number.
+    """
+    if content_type.split(";")[0].strip() not in NDJSON_CONTENT_TYPES:
+        try:
+            check_bulk_size(len(raw_list_decoder.decode(body)))
+        except msgspec.DecodeError:
+            pass  # Reported by the validation below.
+        try:
+            return event_list_adapter.validate_json(body)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=json.loads(e.json(include_url=False)))
+    lines = body.splitlines()
+    check_bulk_size(sum(1 for line in lines if line.strip()))
+    events, errors = [], []
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            events.append(Event.model_validate_json(line))
+        except ValidationError as e:
+            for error in json.loads(e.json(include_url=False)):
+                error["loc"] = [number, *error["loc"]]
+                errors.append(error)
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return events
+
+
+async def processing_create_events_bulk(body: bytes, content_type: str) -> List[Message]:
+    """Creating many events at once; either all of them or none."""
+    events = parse_events(body, content_type)
+    logger.debug("Processing bulk create of {} events.", len(events))
+    if not events:
+        return []
+    if len({event.event_id for event in events}) != len(events):
+        raise HTTPException(status_code=400, detail="Event ids must be unique.")
+    try:
+        created = await event_backend.create_many(events)
+    except EventExists as e:
+        logger.error("Bulk create rejected, event {} already exists.", e)
+        raise HTTPException(status_code=400, detail=f"Event {e} already exists.")
+    for event, _ in created:
+        deadline_scheduler.schedule(event)
+    messages = queue_event_messages(created, "create")
+    logger.info("Created {} events and queued them for RabbitMQ.", len(messages))
+    return messages
 
 
 async def processing_get_event(event_id: str = None) -> Event:
     """Getting event by event_id"""
-    logger.info(f"Fetching event with ID: {event_id}.")
-    if event_id in events:
-        logger.info(f"Event {event_id} found.")
-        return events[event_id]
-    logger.error(f"Event {event_id} not found.")
-    raise HTTPException(status_code=404, detail="Event not found")
+    logger.debug("Fetching event with ID: {}.", event_id)
+    try:
+        event, _ = await event_backend.get(event_id)
+    except EventNotFound:
+        logger.debug("Event {} not found.", event_id)
+        raise HTTPException(status_code=404, detail="Event not found")
+    logger.debug("Event {} found.", event_id)
+    return event
+
+
+async def processing_get_readiness() -> dict:
+    """Checking that events are loaded and RabbitMQ is connected"""
+    status = {
+        "events_loaded": event_backend.is_ready,
+        "rabbitmq": publisher.is_connected,
+    }
+    if not all(status.values()):
+        raise HTTPException(status_code=503, detail=status)
+    return status
+
+
+async def processing_get_metrics() -> bytes:
+    """Getting metrics in the Prometheus text format"""
+    return render()
 
 
 async def processing_get_events() -> List[Event]:
     """Getting all events that are still active. (deadline has not passed)"""
-    logger.info("Fetching active events.")
-    active_events = list(e for e in events.values() if datetime.now().astimezone() < e.deadline)
-    logger.info(f"Found {len(active_events)} active events.")
+    logger.debug("Fetching active events.")
+    active_events = await event_backend.active()
+    logger.debug("Found {} active events.", len(active_events))
     return active_events
 
 
+async def processing_stream_events() -> AsyncIterator[bytes]:
+    """Streaming active events and then their changes as Server-Sent Events"""
+
+    async def snapshot() -> bytes:
+        return event_list_adapter.dump_json(await event_backend.active())
+
+    return event_hub.stream(snapshot)
+
+
+async def update_event(
+    event_id: str,
+    changes: dict[str, Any],
+    action: str,
+    expected_version: int | None = None,
+) -> Message:
+    """Apply a change to an event and publish it.
+
+    With ``expected_version`` the change is only applied if the event has not
+    been modified since that version was read; otherwise 409 is returned.
+    """
+    try:
+        event, version = await event_backend.update(
+            event_id, changes, expected_version
+        )
+    except EventNotFound:
+        logger.debug("Event {} not found for {}.", event_id, action)
+        raise HTTPException(status_code=404, detail="Event not found")
+    except VersionConflict as e:
+        logger.warning("Rejected {} of event {}: {}", action, event_id, e)
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValidationError as e:
+        logger.debug("Rejected invalid {} of event {}.", action, event_id)
+        raise HTTPException(status_code=422, detail=json.loads(e.json(include_url=False)))
+    deadline_scheduler.schedule(event)
+    return await send_event_to_rabbitmq(event, action, version)
+
+
 async def processing_update_coefficient(
-    event_id: str, new_coefficient: Decimal
+    event_id: str, new_coefficient: Decimal, expected_version: int | None = None
 ) -> Message:
     """Changing the coefficient for an event."""
-    logger.info(f"Updating coefficient for event {event_id}.")
-    if event_id in events:
-        event = events[event_id]
-        event.coefficient = new_coefficient
-        logger.info(f"Coefficient for event {event_id} updated to {new_coefficient}.")
-        return await send_event_to_rabbitmq(event, "update_coefficient")
-    logger.error(f"Event {event_id} not found for coefficient update.")
-    raise HTTPException(status_code=404, detail="Event not found")
+    logger.debug("Updating coefficient for event {}.", event_id)
+    message = await update_event(
+        event_id,
+        {"coefficient": new_coefficient},
+        "update_coefficient",
+        expected_version,
+    )
+    logger.info("Coefficient for event {} updated to {}.", event_id, new_coefficient)
+    return message
 
 
-async def processing_update_status(event_id: str, new_status: str) -> Message:
+async def processing_update_status(
+    event_id: str, new_status: EventState, expected_version: int | None = None
+) -> Message:
     """Changing the status for an event."""
-    logger.info(f"Updating status for event {event_id}. New status: {new_status}.")
-    if event_id in events:
-        event = events[event_id]
-        event.state = new_status
-        logger.info(f"Status for event {event_id} updated to {new_status}.")
-        return await send_event_to_rabbitmq(event, "update_status")
-    logger.error(f"Event {event_id} not found for status update.")
-    raise HTTPException(status_code=404, detail="Event not found")
+    logger.debug("Updating status for event {}. New status: {}.", event_id, new_status)
+    message = await update_event(
+        event_id, {"state": new_status}, "update_status", expected_version
+    )
+    logger.info("Status for event {} updated to {}.", event_id, new_status)
+    return message
 
 
-async def processing_update_deadline(event_id: str, new_deadline: float) -> Message:
+async def processing_update_deadline(
+    event_id: str, new_deadline: datetime, expected_version: int | None = None
+) -> Message:
     """Changing the deadline for an event."""
-    logger.info(
-        f"Updating deadline for event {event_id}. New deadline: {new_deadline}."
+    logger.debug(
+        "Updating deadline for event {}. New deadline: {}.", event_id, new_deadline
+    )
+    message = await update_event(
+        event_id, {"deadline": new_deadline}, "update_deadline", expected_version
     )
-    if event_id in events:
-        event = events[event_id]
-        event.deadline = new_deadline
-        logger.info(f"Deadline for event {event_id} updated to {new_deadline}.")
-        return await send_event_to_rabbitmq(event, "update_deadline")
-    logger.error(f"Event {event_id} not found for deadline update.")
-    raise HTTPException(status_code=404, detail="Event not found")
+    logger.info("Deadline for event {} updated to {}.", event_id, new_deadline)
+    return message
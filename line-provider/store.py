@@ -0,0 +1,299 @@
+import bisect
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime
+from decimal import Decimal
+from itertools import filterfalse
+from operator import attrgetter
+from typing import Any
+
+import msgspec
+from schemas import Event
+
+
+class EventExists(Exception):
+    pass
+
+
+class EventNotFound(Exception):
+    pass
+
+
+class VersionConflict(Exception):
+    def __init__(self, event_id: str, expected: int, actual: int):
+        super().__init__(
+            f"Event {event_id} is at version {actual}, expected {expected}."
+        )
+        self.expected = expected
+        self.actual = actual
+
+
+_event_id = attrgetter("event_id")
+_deadline_ts = attrgetter("deadline_ts")
+_index_entry = attrgetter("deadline_ts", "event_id")
+
+
+def deadline_key(deadline: datetime) -> float:
+    """POSIX timestamp of a deadline; naive deadlines are taken as local time."""
+    return deadline.timestamp()
+
+
+def next_version(previous_version: int) -> int:
+    # Versions keep growing across restarts because they start from the clock.
+    return max(time.time_ns(), previous_version + 1)
+
+
+def apply_changes(event: Event, changes: dict[str, Any]) -> Event:
+    """A copy of ``event`` with ``changes``, validated like a new event."""
+    return Event.model_validate({**event.model_dump(), **changes})
+
+
+class EventRecord(msgspec.Struct, array_like=True):
+    """Compact form of an event and its version, as persisted on disk.
+
+    Fields are kept as strings so records decode quickly; they are turned
+    into an ``Event`` only when the event is read.
+    """
+
+    event_id: str
+    coefficient: str
+    deadline: str
+    deadline_ts: float
+    state: str
+    version: int
+
+    @classmethod
+    def from_event(cls, event: Event, version: int) -> "EventRecord":
+        return cls(
+            event_id=event.event_id,
+            coefficient=str(event.coefficient),
+            deadline=event.deadline.isoformat(),
+            deadline_ts=deadline_key(event.deadline),
+            state=event.state,
+            version=version,
+        )
+
+    def to_event(self) -> Event:
+        return Event.model_construct(
+            event_id=self.event_id,
+            coefficient=Decimal(self.coefficient),
+            deadline=datetime.fromisoformat(self.deadline),
+            state=self.state,
+        )
+
+
+class EventStore:
+    """In-memory events with per-event versions and a deadline index.
+
+    Events live in one dict, and writes of an event hold one of ``shards``
+    locks picked by its id, so writers of different events rarely contend.
+    Stored events are never mutated: every change replaces the event with an
+    updated copy and bumps its version, which is what ``expected_version`` is
+    compared against. Events loaded from disk stay ``EventRecord``s until
+    they are first read.
+
+    Active events are kept in ``_deadlines``, a list of ``(deadline, event_id)``
+    sorted by deadline. Entries whose deadline has passed are cut off the
+    front, so listing active events costs O(active) rather than O(all).
+    """
+
+    def __init__(self, shards: int = 16):
+        self.events: dict[str, Event | EventRecord] = {}
+        # Versions of materialized events; records carry their own.
+        self.versions: dict[str, int] = {}
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._deadlines: list[tuple[float, str]] = []
+        self._index_lock = threading.Lock()
+
+    def load(self, snapshot: list[EventRecord], log: list[EventRecord]) -> None:
+        """Fill the store from a snapshot and the log written after it.
+
+        ``snapshot`` holds one record per event in deadline order, so it is
+        loaded with bulk dict and slice operations and its active events are
+        a suffix found by bisection. Only the log, where the latest record of
+        an event wins, is walked per record. Meant for startup, before the
+        store is shared.
+        """
+        events = dict(zip(map(_event_id, snapshot), snapshot))
+        now = time.time()
+        first_active = bisect.bisect_right(snapshot, now, key=_deadline_ts)
+        deadlines = list(map(_index_entry, snapshot[first_active:]))
+
+        latest = dict(zip(map(_event_id, log), log))
+        replaced = {
+            _index_entry(previous)
+            for event_id in latest
+            if (previous := events.get(event_id)) is not None
+        }
+        if replaced:
+            deadlines = list(filterfalse(replaced.__contains__, deadlines))
+        events.update(latest)
+        # Two sorted runs, which the sort merges in linear time.
+        deadlines.extend(
+            _index_entry(record)
+            for record in latest.values()
+            if record.deadline_ts > now
+        )
+        deadlines.sort()
+
+        self.events, self.versions, self._deadlines = events, {}, deadlines
+
+    def records(self) -> list[EventRecord]:
+        """Every event with its current version, in deadline order."""
+        # Each copy is a single call writers can not interleave with. Versions
+        # are written before events, so every copied event has its version.
+        items = list(self.events.items())
+        versions = self.versions.copy()
+        records = [
+            value
+            if isinstance(value, EventRecord)
+            else EventRecord.from_event(value, versions[event_id])
+            for event_id, value in items
+        ]
+        records.sort(key=_deadline_ts)
+        return records
+
+    def open_deadlines(self) -> list[tuple[float, str]]:
+        """``(deadline, event_id)`` of every ``NEW`` event, overdue ones included."""
+        return [
+            (
+                value.deadline_ts
+                if isinstance(value, EventRecord)
+                else deadline_key(value.deadline),
+                event_id,
+            )
+            for event_id, value in list(self.events.items())
+            if value.state == "NEW"
+        ]
+
+    def _lock(self, event_id: str) -> threading.Lock:
+        return self._locks[hash(event_id) % len(self._locks)]
+
+    def _current(self, event_id: str) -> tuple[Event, int, float] | None:
+        """The event, its version and its index key; materializes records.
+
+        Must be called with the event's lock held.
+        """
+        value = self.events.get(event_id)
+        if value is None:
+            return None
+        if isinstance(value, EventRecord):
+            event = value.to_event()
+            self.versions[event_id] = value.version
+            self.events[event_id] = event
+            return event, value.version, value.deadline_ts
+        return value, self.versions[event_id], deadline_key(value.deadline)
+
+    def _event(self, event_id: str) -> Event | None:
+        value = self.events.get(event_id)
+        if isinstance(value, EventRecord):
+            with self._lock(event_id):
+                current = self._current(event_id)
+            return current[0] if current else None
+        return value
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self.events
+
+    def get(self, event_id: str) -> Event:
+        event = self._event(event_id)
+        if event is None:
+            raise EventNotFound(event_id)
+        return event
+
+    def get_version(self, event_id: str) -> int:
+        value = self.events.get(event_id)
+        if isinstance(value, EventRecord):
+            return value.version
+        return self.versions.get(event_id, 0)
+
+    def create(self, event: Event) -> tuple[Event, int]:
+        """Add a new event; returns it with its first version."""
+        with self._lock(event.event_id):
+            if event.event_id in self.events:
+                raise EventExists(event.event_id)
+            version = self._put(event, 0)
+            self._index(None, event)
+        return event, version
+
+    def create_many(self, events: list[Event]) -> list[tuple[Event, int]]:
+        """Add new events all at once, or none of them if any already exists.
+
+        ``events`` must have distinct ids. The locks of every event involved
+        are taken in order, so concurrent bulk creates can not deadlock.
+        """
+        shards = {hash(event.event_id) % len(self._locks) for event in events}
+        with ExitStack() as stack:
+            for shard in sorted(shards):
+                stack.enter_context(self._locks[shard])
+            for event in events:
+                if event.event_id in self.events:
+                    raise EventExists(event.event_id)
+            created = [(event, self._put(event, 0)) for event in events]
+            now = time.time()
+            entries = [
+                (key, event.event_id)
+                for event in events
+                if (key := deadline_key(event.deadline)) > now
+            ]
+            with self._index_lock:
+                self._deadlines.extend(entries)
+                self._deadlines.sort()
+        return created
+
+    def update(
+        self,
+        event_id: str,
+        changes: dict[str, Any],
+        expected_version: int | None = None,
+    ) -> tuple[Event, int]:
+        """Apply ``changes`` to an event; returns the new event and version.
+
+        With ``expected_version`` the update is a compare-and-set: it is
+        applied only if the event is still at that version.
+        """
+        with self._lock(event_id):
+            current = self._current(event_id)
+            if current is None:
+                raise EventNotFound(event_id)
+            previous, actual, previous_key = current
+            if expected_version is not None and expected_version != actual:
+                raise VersionConflict(event_id, expected_version, actual)
+            event = apply_changes(previous, changes)
+            version = self._put(event, actual)
+            if event.deadline != previous.deadline:
+                self._index(previous_key, event)
+        return event, version
+
+    def _put(self, event: Event, previous_version: int) -> int:
+        version = next_version(previous_version)
+        self.versions[event.event_id] = version
+        self.events[event.event_id] = event
+        return version
+
+    def _index(self, previous_key: float | None, event: Event) -> None:
+        with self._index_lock:
+            if previous_key is not None:
+                entry = (previous_key, event.event_id)
+                position = bisect.bisect_left(self._deadlines, entry)
+                if position < len(self._deadlines) and self._deadlines[position] == entry:
+                    del self._deadlines[position]
+            entry = (deadline_key(event.deadline), event.event_id)
+            if entry[0] > time.time():
+                bisect.insort(self._deadlines, entry)
+
+    def active(self) -> list[Event]:
+        """Events whose deadline has not passed, earliest deadline first."""
+        with self._index_lock:
+            expired = bisect.bisect_right(self._deadlines, (time.time(), "\U0010ffff"))
+            del self._deadlines[:expired]
+            event_ids = [event_id for _, event_id in self._deadlines]
+        return [
+            event
+            for event_id in event_ids
+            if (event := self._event(event_id)) is not None
+        ]
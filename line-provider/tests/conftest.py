@@ -0,0 +1,47 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from codec import EventMessage
+from schemas import Event
+
+
+@pytest.fixture
+def make_event():
+    """Factory of events, open and due in a day unless told otherwise."""
+
+    def make(
+        event_id: str,
+        deadline: datetime | None = None,
+        state: str = "NEW",
+        coefficient: str = "1.5",
+    ) -> Event:
+        return Event(
+            event_id=event_id,
+            coefficient=Decimal(coefficient),
+            deadline=deadline or datetime.now() + timedelta(days=1),
+            state=state,
+        )
+
+    return make
+
+
+@pytest.fixture
+def make_message():
+    """Factory of coefficient update messages for events due in a day."""
+
+    def make(event_id: str, coefficient: str = "1.5", version: int = 1) -> EventMessage:
+        return EventMessage(
+            event_id=event_id,
+            coefficient=Decimal(coefficient),
+            deadline=datetime.now() + timedelta(days=1),
+            state="NEW",
+            action="update_coefficient",
+            version=version,
+        )
+
+    return make
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from backends import CachedBackend, SQLiteBackend
+from store import EventExists, VersionConflict
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_is_shared_between_instances(tmp_path, make_event):
+    """Test that two instances on one SQLite file see each other's writes"""
+    path = str(tmp_path / "events.sqlite3")
+    first, second = SQLiteBackend(path), SQLiteBackend(path)
+    await first.start()
+    await second.start()
+    now = datetime.now()
+    _, version = await first.create(make_event("event1", now + timedelta(days=2)))
+    await second.create(make_event("event2", now + timedelta(days=1)))
+    await second.create(make_event("past", now - timedelta(days=1)))
+    with pytest.raises(EventExists):
+        await second.create(make_event("event1", now))
+
+    await second.update("event1", {"coefficient": Decimal("2.0")}, version)
+    with pytest.raises(VersionConflict):
+        await first.update("event1", {"coefficient": Decimal("3.0")}, version)
+
+    event, _ = await first.get("event1")
+    active = [event.event_id for event in await first.active()]
+    await first.stop()
+    await second.stop()
+
+    assert event.coefficient == Decimal("2.0")
+    assert active == ["event2", "event1"]
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_until_invalidated(tmp_path, make_event):
+    """Test that cached reads stay local until a newer version is announced"""
+    path = str(tmp_path / "events.sqlite3")
+    cached = CachedBackend(SQLiteBackend(path), max_size=10)
+    other = SQLiteBackend(path)
+    await cached.start()
+    await other.start()
+    await cached.create(make_event("event1"))
+    _, version = await other.update("event1", {"coefficient": Decimal("2.0")})
+
+    stale, _ = await cached.get("event1")
+    cached.invalidate("event1", version)
+    fresh, _ = await cached.get("event1")
+    await cached.stop()
+    await other.stop()
+
+    assert stale.coefficient == Decimal("1.5")
+    assert fresh.coefficient == Decimal("2.0")
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from batcher import EventUpdateBuffer
+from codec import JSON_CONTENT_TYPE, decode
+
+
+class RecordingPublisher:
+    is_connected = True
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, body: bytes, content_type: str, message_id: str):
+        self.sent.append(decode(body, content_type))
+
+
+@pytest.mark.asyncio
+async def test_updates_are_coalesced_per_event(make_message):
+    """Test that only the latest pending update per event is published"""
+    publisher = RecordingPublisher()
+    buffer = EventUpdateBuffer(
+        publisher, window_ms=50, max_batch_size=100, content_type=JSON_CONTENT_TYPE
+    )
+    buffer.add(make_message("event1", "1.5", 1))
+    buffer.add(make_message("event1", "1.7", 3))
+    buffer.add(make_message("event1", "1.6", 2))
+    buffer.add(make_message("event2", "2.0", 1))
+
+    await buffer.flush()
+
+    assert len(publisher.sent) == 1
+    events = {event.event_id: event for event in publisher.sent[0].events}
+    assert events.keys() == {"event1", "event2"}
+    assert events["event1"].coefficient == Decimal("1.7")
+
+
+@pytest.mark.asyncio
+async def test_flush_splits_by_max_batch_size(make_message):
+    """Test that a flush never publishes more than max_batch_size events at once"""
+    publisher = RecordingPublisher()
+    buffer = EventUpdateBuffer(
+        publisher, window_ms=50, max_batch_size=2, content_type=JSON_CONTENT_TYPE
+    )
+    for i in range(5):
+        buffer.add(make_message(f"event{i}", "1.5", 1))
+
+    await buffer.flush()
+
+    assert len(publisher.sent) == 3
+    assert buffer.pending == {}
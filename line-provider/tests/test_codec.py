@@ -0,0 +1,58 @@
+import os
+import sys
+
+import msgspec
+import pytest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from codec import (
+    JSON_CONTENT_TYPE,
+    MSGPACK_CONTENT_TYPE,
+    EventBatch,
+    EventMessage,
+    decode,
+    encode,
+)
+
+
+@pytest.fixture
+def sample_batch():
+    return EventBatch(
+        events=[
+            EventMessage(
+                event_id="event1",
+                coefficient=Decimal("1.50"),
+                deadline=datetime.now(timezone.utc) + timedelta(days=1),
+                state="NEW",
+                action="create",
+                version=1,
+            )
+        ]
+    )
+
+
+@pytest.mark.parametrize("content_type", [JSON_CONTENT_TYPE, MSGPACK_CONTENT_TYPE])
+def test_round_trip(sample_batch, content_type):
+    """Test that a batch survives encoding and decoding unchanged"""
+    body = encode(sample_batch, content_type)
+    assert decode(body, content_type) == sample_batch
+
+
+def test_missing_content_type_defaults_to_json(sample_batch):
+    """Test that messages without a content type are decoded as JSON"""
+    assert decode(encode(sample_batch)) == sample_batch
+
+
+def test_unknown_schema_version_is_rejected(sample_batch):
+    """Test that payloads of another schema version are not decoded"""
+    body = encode(sample_batch).replace(b'"schema_version":1', b'"schema_version":2')
+    with pytest.raises(msgspec.ValidationError):
+        decode(body)
+
+
+def test_unknown_content_type_is_rejected(sample_batch):
+    """Test that unsupported content types raise ValueError"""
+    with pytest.raises(ValueError):
+        encode(sample_batch, "text/plain")
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from eventlog import EventLog
+from store import EventStore
+
+
+@pytest.mark.asyncio
+async def test_replay_restores_latest_state(tmp_path, make_event):
+    """Test that replay restores the last written state and version of every event"""
+    log = EventLog(str(tmp_path), fsync_interval_ms=10, compact_bytes=1 << 20)
+    assert log.replay() == ([], [])
+    log.append(make_event("event1"), 1)
+    log.append(make_event("event2", coefficient="2.0"), 1)
+    log.append(make_event("event1", coefficient="1.7"), 2)
+    await log.stop()
+    intact = log.log_path.stat().st_size
+
+    with open(log.log_path, "ab") as file:
+        file.write(b"\x40\x00\x00\x00torn")
+
+    store = EventStore(shards=4)
+    store.load(*EventLog(str(tmp_path), 10, 1 << 20).replay())
+    assert store.get("event1").coefficient == Decimal("1.7")
+    assert store.get_version("event1") == 2
+    assert store.get_version("event2") == 1
+    assert [event.event_id for event in store.active()] == ["event2", "event1"]
+    assert log.log_path.stat().st_size == intact
+
+
+@pytest.mark.asyncio
+async def test_compaction_moves_live_events_to_snapshot(tmp_path, make_event):
+    """Test that compaction writes a snapshot and empties the log"""
+    store = EventStore(shards=4)
+    log = EventLog(str(tmp_path), fsync_interval_ms=10, compact_bytes=1 << 20)
+    log.replay()
+    for i in range(10):
+        event, version = store.create(make_event(f"event{i}"))
+        log.append(event, version)
+    store.update("event3", {"coefficient": Decimal("2.5")})
+
+    await log.start(store.records)
+    await log.flush()
+    await log.compact()
+    await log.stop()
+
+    assert log.log_path.stat().st_size == 0
+    restored = EventStore(shards=4)
+    restored.load(*EventLog(str(tmp_path), 10, 1 << 20).replay())
+    assert restored.records() == store.records()
+    assert restored.get("event3").coefficient == Decimal("2.5")
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from hub import EventHub
+
+
+async def snapshot() -> bytes:
+    return b"[]"
+
+
+@pytest.mark.asyncio
+async def test_slow_subscribers_get_conflated_updates(make_message):
+    """Test that a subscriber gets the snapshot, then only the latest update per event"""
+    hub = EventHub(max_pending=10, keepalive_s=5)
+    stream = hub.stream(snapshot)
+    first = await anext(stream)
+    hub.publish([make_message("event1", "1.5", 1)])
+    hub.publish([make_message("event1", "1.7", 2), make_message("event2", "2.0", 1)])
+    second = await anext(stream)
+    await stream.aclose()
+
+    assert first == b"event: snapshot\ndata: []\n\n"
+    assert second.count(b"event: update") == 2
+    assert b'"coefficient":"1.7"' in second and b'"coefficient":"1.5"' not in second
+    assert hub.stats() == {"subscribers": 0, "dropped": 0}
+
+
+@pytest.mark.asyncio
+async def test_subscribers_too_far_behind_are_dropped(make_message):
+    """Test that a subscriber with more than max_pending events queued is disconnected"""
+    hub = EventHub(max_pending=2, keepalive_s=5)
+    stream = hub.stream(snapshot)
+    await anext(stream)
+    hub.publish([make_message(f"event{i}") for i in range(3)])
+    rest = [frame async for frame in stream]
+
+    assert rest == []
+    assert hub.stats() == {"subscribers": 0, "dropped": 1}
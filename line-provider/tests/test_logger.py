@@ -0,0 +1,41 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from logger import LogLimiter, json_format
+from loguru import logger
+
+
+def make_record(line: int, function: str = "handler") -> dict:
+    return {"name": "services", "function": function, "line": line, "extra": {}}
+
+
+def test_call_sites_are_rate_limited_and_sampled():
+    """Test that each call site is limited on its own and reports what it dropped"""
+    limiter = LogLimiter(per_second=0.001, burst=2, sampling={"services:hot": 0.0})
+
+    assert [limiter(make_record(10)) for _ in range(5)] == [True, True, False, False, False]
+    assert limiter(make_record(11))
+    assert not limiter(make_record(12, function="hot"))
+
+    tokens, updated, suppressed = limiter._buckets[("services", 10)]
+    limiter._buckets[("services", 10)] = (tokens, updated - 10000, suppressed)
+    record = make_record(10)
+    assert limiter(record)
+    assert record["extra"]["suppressed"] == 3
+
+
+def test_records_are_written_as_json_lines():
+    """Test that the JSON format writes one object per record with its extras"""
+    lines = []
+    handler = logger.add(lines.append, format=json_format)
+    try:
+        logger.bind(event_id="event1").warning("Event {} is late.", "event1")
+    finally:
+        logger.remove(handler)
+
+    entry = json.loads(lines[0])
+    assert entry["message"] == "Event event1 is late."
+    assert entry["level"] == "WARNING"
+    assert entry["extra"] == {"event_id": "event1"}
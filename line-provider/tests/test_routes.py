@@ -1,3 +1,4 @@
+import json
 import os
 import sys
 
@@ -7,6 +8,7 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from config import settings
 from main import app
 from fastapi.encoders import jsonable_encoder
 
@@ -72,6 +74,12 @@ def test_update_coefficient(sample_event):
     response = client.put(f"/update_coefficient?event_id=bad_id&new_coefficient={new_coefficient}")
     assert response.status_code == 404
 
+    response = client.put(
+        f"/update_coefficient?event_id={sample_event['event_id']}&new_coefficient=-5"
+    )
+    assert response.status_code == 422
+    assert client.get(f"/event/{sample_event['event_id']}").json()["coefficient"] == "2.0"
+
 
 def test_update_status(sample_event):
     """Test updating the status of an event"""
@@ -85,6 +93,11 @@ def test_update_status(sample_event):
     assert data["state"] == new_status
     response = client.put(f"/update_status?event_id=bad_id&new_status={new_status}")
     assert response.status_code == 404
+    response = client.put(
+        f"/update_status?event_id={sample_event['event_id']}&new_status=BOGUS"
+    )
+    assert response.status_code == 422
+    assert client.get("/events").status_code == 200
 
 
 def test_update_deadline(sample_event):
@@ -102,3 +115,63 @@ def test_update_deadline(sample_event):
     )
     assert response.status_code == 404
 
+
+def test_create_events_bulk():
+    """Test creating events from JSON arrays and NDJSON, all or nothing"""
+    deadline = (datetime.now() + timedelta(days=1)).isoformat()
+    events = [
+        {"event_id": f"bulk{i}", "coefficient": "1.5", "deadline": deadline, "state": "NEW"}
+        for i in range(3)
+    ]
+    response = client.post("/events/bulk", json=events[:2])
+    assert response.status_code == 200
+    assert [message["event_id"] for message in response.json()] == ["bulk0", "bulk1"]
+
+    response = client.post("/events/bulk", json=events[1:])
+    assert response.status_code == 400
+    assert client.get("/event/bulk2").status_code == 404
+
+    invalid = {**events[2], "event_id": "bulk3", "coefficient": "-1"}
+    body = "\n".join(json.dumps(event) for event in [events[2], invalid])
+    response = client.post(
+        "/events/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == [2, "coefficient"]
+
+    response = client.post(
+        "/events/bulk",
+        content=json.dumps(events[2]) + "\n",
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert client.get("/event/bulk2").status_code == 200
+
+
+def test_create_events_bulk_refuses_oversized_bodies(monkeypatch):
+    """Test that too many events are refused with 413 before being validated"""
+    monkeypatch.setattr(settings, "EVENT_BULK_MAX_SIZE", 2)
+    invalid = [{"event_id": f"big{i}", "coefficient": "-1"} for i in range(3)]
+
+    response = client.post("/events/bulk", json=invalid)
+    assert response.status_code == 413
+
+    response = client.post(
+        "/events/bulk",
+        content="\n".join(json.dumps(event) for event in invalid) + "\n\n",
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 413
+
+    response = client.post("/events/bulk", json=invalid[:2])
+    assert response.status_code == 422
+
+
+def test_metrics(sample_event):
+    """Test that request latency is exported per route template"""
+    client.post("/event", json=jsonable_encoder(sample_event))
+    client.get(f"/event/{sample_event['event_id']}")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'route="/event/{event_id}"' in response.text
+    assert "event_store_events" in response.text
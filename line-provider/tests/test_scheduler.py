@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import services
+from backends import MemoryBackend
+from eventlog import EventLog
+from scheduler import DeadlineScheduler
+from services import close_expired_events, event_backend, update_buffer
+from store import EventStore, deadline_key
+
+
+@pytest.mark.asyncio
+async def test_due_events_are_closed_in_one_batch(make_event):
+    """Test that events due at the same time are handed over together"""
+    batches = []
+    now = datetime.now()
+    kickoff = deadline_key(now + timedelta(milliseconds=100))
+
+    async def close(event_ids):
+        batches.append(sorted(event_ids))
+
+    async def load():
+        return [(kickoff, "kickoff1"), (kickoff, "kickoff2")]
+
+    scheduler = DeadlineScheduler(close, load)
+    await scheduler.start()
+    scheduler.schedule(make_event("settled", now, state="FINISHED_WIN"))
+    scheduler.schedule(make_event("first", now + timedelta(milliseconds=20)))
+    await asyncio.sleep(0.3)
+    await scheduler.stop()
+
+    assert batches == [["first"], ["kickoff1", "kickoff2"]]
+
+
+@pytest.mark.asyncio
+async def test_close_skips_events_that_are_no_longer_due(make_event):
+    """Test that only open events past their deadline are closed and published"""
+    now = datetime.now()
+    await event_backend.create(make_event("closing", now - timedelta(seconds=1)))
+    await event_backend.create(make_event("moved", now + timedelta(days=1)))
+    await close_expired_events(["closing", "moved", "unknown"])
+
+    assert (await event_backend.get("closing"))[0].state == "CLOSED"
+    assert (await event_backend.get("moved"))[0].state == "NEW"
+    assert update_buffer.pending["closing"].action == "close"
+    assert "moved" not in update_buffer.pending
+
+
+@pytest.mark.asyncio
+async def test_events_overdue_at_startup_are_closed(tmp_path, monkeypatch, make_event):
+    """Test that a NEW event whose deadline passed while down is closed on start"""
+    first = MemoryBackend(EventStore(), EventLog(str(tmp_path), 0, 1 << 20))
+    await first.start()
+    await first.create(make_event("overdue", datetime.now() - timedelta(seconds=5)))
+    await first.stop()
+
+    second = MemoryBackend(EventStore(), EventLog(str(tmp_path), 0, 1 << 20))
+    await second.start()
+    monkeypatch.setattr(services, "event_backend", second)
+    scheduler = DeadlineScheduler(close_expired_events, second.open_deadlines)
+    await scheduler.start()
+    await asyncio.sleep(0.1)
+    await scheduler.stop()
+    await second.stop()
+
+    assert (await second.get("overdue"))[0].state == "CLOSED"
+    assert update_buffer.pending["overdue"].action == "close"
+
+
+def test_updates_keep_one_entry_per_event(make_event):
+    """Test that updates leaving the deadline alone do not grow the heap"""
+
+    async def load():
+        return []
+
+    scheduler = DeadlineScheduler(close_expired_events, load)
+    deadline = datetime.now() + timedelta(days=1)
+    for _ in range(1000):
+        scheduler.schedule(make_event("event1", deadline))
+        scheduler.schedule(make_event("event2", deadline))
+    assert len(scheduler._deadlines) == 2
+
+    scheduler.schedule(make_event("event1", deadline + timedelta(hours=1)))
+    scheduler.schedule(make_event("event2", deadline, state="FINISHED_WIN"))
+    assert scheduler._scheduled_at == {
+        "event1": deadline_key(deadline + timedelta(hours=1))
+    }
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from store import EventExists, EventRecord, EventStore, VersionConflict
+
+
+def test_active_lists_open_events_by_deadline(make_event):
+    """Test that only open events are listed, earliest deadline first"""
+    store = EventStore(shards=4)
+    now = datetime.now()
+    store.create(make_event("later", now + timedelta(days=2)))
+    store.create(make_event("past", now - timedelta(days=1)))
+    store.create(make_event("aware", datetime.now(timezone.utc) + timedelta(days=1)))
+    store.create(make_event("expiring", now + timedelta(days=3)))
+    store.update("expiring", {"deadline": now - timedelta(seconds=1)})
+
+    assert [event.event_id for event in store.active()] == ["aware", "later"]
+    assert len(store) == 4
+
+
+def test_compare_and_set_rejects_stale_versions(make_event):
+    """Test that an update against an outdated version is refused"""
+    store = EventStore(shards=4)
+    event, version = store.create(make_event("event1", datetime.now()))
+    with pytest.raises(EventExists):
+        store.create(event)
+
+    updated, new_version = store.update(
+        "event1", {"coefficient": Decimal("2.0")}, expected_version=version
+    )
+    assert new_version > version
+    assert updated.coefficient == Decimal("2.0")
+    assert event.coefficient == Decimal("1.5")
+
+    with pytest.raises(VersionConflict):
+        store.update("event1", {"coefficient": Decimal("3.0")}, expected_version=version)
+    assert store.get("event1").coefficient == Decimal("2.0")
+
+
+def test_load_merges_snapshot_and_log(make_event):
+    """Test that log records replace their snapshot records in the deadline index"""
+    now = datetime.now()
+    snapshot = [
+        EventRecord.from_event(make_event(event_id, now + timedelta(hours=hours)), 1)
+        for event_id, hours in [("past", -1), ("first", 1), ("moved", 2), ("last", 3)]
+    ]
+    log = [
+        EventRecord.from_event(make_event("moved", now + timedelta(hours=4)), 2),
+        EventRecord.from_event(make_event("added", now + timedelta(minutes=90)), 1),
+        EventRecord.from_event(make_event("moved", now + timedelta(hours=5)), 3),
+    ]
+    store = EventStore(shards=4)
+    store.load(snapshot, log)
+
+    assert [event.event_id for event in store.active()] == [
+        "first",
+        "added",
+        "last",
+        "moved",
+    ]
+    assert store.get_version("moved") == 3
+    assert len(store) == 5